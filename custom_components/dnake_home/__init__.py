@@ -1,93 +1,303 @@
+import asyncio
 import logging
+import time
 from datetime import timedelta
+
+import voluptuous as vol
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers.device_registry import async_get  # 新增导入 device_registry
-from homeassistant.helpers.entity_registry import async_get as async_get_entity_registry  # 可选：如果需要实体注册
-from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse, callback
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.device_registry import async_get, async_entries_for_config_entry  # 新增导入 device_registry
+from homeassistant.helpers.entity_registry import async_migrate_entries
 
-from .core.assistant import assistant
+from .cache import StateSnapshotCache, TopologyCache, get_topology
+from .coordinator import DEFAULT_MAX_SCAN_INTERVAL, DnakeRefreshCoordinator
+from .core.assistant import BATCH_COMMANDS, DEFAULT_READ_MAX_AGE, Assistant
 from .core.constant import DOMAIN, MANUFACTURER  # 新增导入 MANUFACTURER（从 constant.py）
-from .cover import load_covers, update_covers_state
-from .light import load_lights, update_lights_state
-from .climate import load_climates, update_climates_state
-from .fan import load_fans, update_fans_state  # 新增 fan
+from .core.journal import DEFAULT_JOURNAL_SIZE
+from .core.profiler import ProfileSession
+from .core.scheduler import DEFAULT_MAX_CONCURRENCY
+from .core.tiers import DEFAULT_COLD_BUDGET, DEFAULT_HOT_BUDGET
+from .core.store import get_state_key
+from .core.registry import DEVICE_TYPES
+# 导入各平台模块以注册其设备类型
+from . import climate, cover, fan, light  # noqa: F401
 
 _LOGGER = logging.getLogger(__name__)
 
-PLATFORMS = [Platform.LIGHT, Platform.COVER, Platform.CLIMATE, Platform.FAN]  # 增加 FAN
+PLATFORMS = [Platform.LIGHT, Platform.COVER, Platform.CLIMATE, Platform.FAN, Platform.SENSOR]  # 增加 FAN
+
+SERVICE_REFRESH = "refresh"
+SERVICE_BATCH_CONTROL = "batch_control"
+SERVICE_PROFILE = "profile"
+
+BATCH_CONTROL_SCHEMA = vol.Schema(
+    {
+        vol.Optional("config_entry_id"): cv.string,
+        vol.Required("commands"): vol.All(
+            cv.ensure_list,
+            [
+                vol.Schema(
+                    {
+                        vol.Required("dev_no"): vol.Coerce(int),
+                        vol.Required("dev_ch"): vol.Coerce(int),
+                        vol.Required("command"): vol.In(BATCH_COMMANDS),
+                        vol.Optional("params", default={}): dict,
+                    }
+                )
+            ],
+        ),
+    }
+)
+
+PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Optional("config_entry_id"): cv.string,
+        vol.Optional("cycles", default=5): vol.All(vol.Coerce(int), vol.Range(min=0)),
+        vol.Optional("commands", default=0): vol.All(vol.Coerce(int), vol.Range(min=0)),
+        vol.Optional("timeout", default=300): vol.All(vol.Coerce(int), vol.Range(min=1)),
+    }
+)
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     gateway_ip = entry.data["gateway_ip"]
     auth_username = entry.data["auth_username"]
     auth_password = entry.data["auth_password"]
+    # 每个配置条目对应一个网关，各自持有独立的 Assistant 与设备集合
+    assistant = Assistant(
+        entry.entry_id,
+        max_concurrency=entry.data.get("max_concurrency", DEFAULT_MAX_CONCURRENCY),
+        hot_budget=entry.data.get("hot_poll_budget", DEFAULT_HOT_BUDGET),
+        cold_budget=entry.data.get("cold_poll_budget", DEFAULT_COLD_BUDGET),
+        read_max_age=entry.data.get("read_max_age", DEFAULT_READ_MAX_AGE),
+        journal_size=entry.data.get("journal_size", DEFAULT_JOURNAL_SIZE),
+    )
+    assistant.bind_session(async_get_clientsession(hass))
     assistant.bind_auth_info(gateway_ip, auth_username, auth_password)
-    iot_info = await hass.async_add_executor_job(assistant.query_iot_info)
-    if iot_info:
-        iot_device_name = iot_info.get("iot_device_name")
-        gw_iot_name = iot_info.get("gw_iot_name")
-        assistant.bind_iot_info(iot_device_name, gw_iot_name)
-        device_list = await hass.async_add_executor_job(assistant.query_device_list)
-        if device_list:
-            # 新增：注册网关设备（gateway），以支持 via_device 引用
-            device_registry = async_get(hass)
-            gateway_device = device_registry.async_get_or_create(
-                config_entry_id=entry.entry_id,  # 绑定到当前 config_entry
-                identifiers={(DOMAIN, "gateway")},
-                name="Dnake Gateway",  # 可自定义名称
-                manufacturer=MANUFACTURER,
-                model="Smart Home Gateway",  # 可自定义模型
-                sw_version=gw_iot_name,  # 可选：使用 IoT 名称作为版本
-                connections={(  # 可选：如果有 MAC 或其他连接
-                    "ip", gateway_ip  # 示例：IP 连接
-                )},
-            )
-            _LOGGER.debug(f"Gateway device registered: {gateway_device.id}")
-
-            # 设备分类
-            load_lights(device_list)
-            load_covers(device_list)
-            load_climates(device_list)
-            load_fans(device_list)  # 新增 fan
-            # 初始化各类设备
-            await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
-
-            # 新增：初始化 previous_states
-            hass_data = hass.data.setdefault(DOMAIN, {})
-            hass_data["previous_states"] = {}
-
-            async def _async_refresh_states(now=None):
-                _LOGGER.info("update all device state")
-                states = await hass.async_add_executor_job(assistant.read_all_dev_state)
-                # 新增：状态比对
-                previous = hass_data["previous_states"]
-                for state in states or []:
-                    key = f"{state.get('devNo')}_{state.get('devCh')}"
-                    old_state = previous.get(key, {})
-                    if old_state != state:
-                        _LOGGER.info(f"Device {key} state changed: {old_state} -> {state}")
-                    previous[key] = state.copy()
-                # 原有更新逻辑
-                update_lights_state(states)
-                update_covers_state(states)
-                update_climates_state(states)
-                update_fans_state(states)  # 新增 fan 状态更新
-
-            # 初始化设备状态
-            await _async_refresh_states()
-            # 定时刷新设备状态
-            time_delta = timedelta(seconds=entry.data["scan_interval"])
-            async_track_time_interval(hass, _async_refresh_states, time_delta)
-            return True
-        else:
-            _LOGGER.error("query_device_list fail")
+
+    # 优先使用缓存的拓扑立即创建实体，再在后台与网关核对
+    topology_cache = TopologyCache(hass, entry.entry_id)
+    iot_info, device_list = await topology_cache.async_load()
+    from_cache = device_list is not None
+    if not from_cache:
+        iot_info, device_list = await _async_discover(assistant)
+        if not iot_info or not device_list:
             return False
+        await topology_cache.async_save(iot_info, device_list)
+
+    iot_device_name = iot_info.get("iot_device_name")
+    gw_iot_name = iot_info.get("gw_iot_name")
+    assistant.bind_iot_info(iot_device_name, gw_iot_name)
+    # 新增：注册网关设备（gateway），以支持 via_device 引用
+    device_registry = async_get(hass)
+    gateway_device = device_registry.async_get_or_create(
+        config_entry_id=entry.entry_id,  # 绑定到当前 config_entry
+        identifiers={assistant.gateway_identifier},
+        name="Dnake Gateway",  # 可自定义名称
+        manufacturer=MANUFACTURER,
+        model="Smart Home Gateway",  # 可自定义模型
+        sw_version=gw_iot_name,  # 可选：使用 IoT 名称作为版本
+        connections={(  # 可选：如果有 MAC 或其他连接
+            "ip", gateway_ip  # 示例：IP 连接
+        )},
+    )
+    _LOGGER.debug(f"Gateway device registered: {gateway_device.id}")
+
+    # 恢复上次保存的状态快照：实体直接以最近的真实状态初始化，首次轮询也只会分发真正的变化
+    state_snapshot = StateSnapshotCache(hass, entry.entry_id)
+    assistant.states.update(await state_snapshot.async_load())
+    device_list = [_merge_last_state(assistant, device) for device in device_list]
+
+    # 设备分类：按 devType 注册表单次遍历创建所有实体
+    assistant.entries = DEVICE_TYPES.create_entities(assistant, device_list)
+
+    # 全量刷新由 coordinator 统一调度，避免请求重叠；各网关独立调度、互不阻塞
+    time_delta = timedelta(seconds=entry.data["scan_interval"])
+    max_time_delta = timedelta(seconds=entry.data.get("max_scan_interval", DEFAULT_MAX_SCAN_INTERVAL))
+    coordinator = DnakeRefreshCoordinator(
+        hass,
+        assistant,
+        time_delta,
+        max_time_delta,
+        state_snapshot,
+        event_sampling=entry.data.get("state_event_sampling", 0),
+    )
+    hass.data.setdefault(DOMAIN, {})[entry.entry_id] = {
+        "assistant": assistant,
+        "coordinator": coordinator,
+    }
+    entry.async_on_unload(coordinator.async_shutdown)
+    entry.async_on_unload(lambda: state_snapshot.async_save(assistant.states))
+    _async_register_services(hass)
+
+    # 初始化各类设备
+    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    if from_cache:
+        # 不阻塞启动：后台核对拓扑并获取首次状态
+        entry.async_create_background_task(
+            hass,
+            _async_reconcile_topology(hass, entry, assistant, topology_cache, device_list),
+            f"{DOMAIN}_reconcile_{entry.entry_id}",
+        )
+        entry.async_create_background_task(
+            hass, coordinator.async_refresh(), f"{DOMAIN}_first_refresh_{entry.entry_id}"
+        )
     else:
+        # 初始化设备状态，之后按间隔定时刷新
+        await coordinator.async_refresh()
+    return True
+
+
+def _merge_last_state(assistant: Assistant, device):
+    last_state = assistant.states.get(get_state_key(device.get("ty"), device.get("nm"), device.get("ch")))
+    return {**device, **last_state} if last_state else device
+
+
+async def _async_discover(assistant: Assistant):
+    iot_info = await assistant.query_iot_info()
+    if not iot_info:
         _LOGGER.error("query_iot_info fail")
-        return False
+        return None, None
+    # 拉取设备列表前需要先绑定 iot 信息
+    assistant.bind_iot_info(iot_info.get("iot_device_name"), iot_info.get("gw_iot_name"))
+    device_list = await assistant.query_device_list()
+    if not device_list:
+        _LOGGER.error("query_device_list fail")
+        return iot_info, None
+    return iot_info, device_list
+
+
+async def _async_reconcile_topology(
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        assistant: Assistant,
+        topology_cache: TopologyCache,
+        cached_device_list,
+):
+    """与网关核对缓存的拓扑，只有设备增删或改名时才重新加载配置条目"""
+    iot_info, device_list = await _async_discover(assistant)
+    if not iot_info or not device_list:
+        _LOGGER.warning("reconcile topology fail, keep using cached device list")
+        return
+    await topology_cache.async_save(iot_info, device_list)
+    if get_topology(device_list) != get_topology(cached_device_list):
+        _LOGGER.info("gateway topology changed, reload config entry")
+        hass.async_create_task(hass.config_entries.async_reload(entry.entry_id))
 
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
-    return await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
\ No newline at end of file
+    unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    if unload_ok:
+        hass.data[DOMAIN].pop(entry.entry_id, None)
+        if not hass.data[DOMAIN]:
+            hass.services.async_remove(DOMAIN, SERVICE_REFRESH)
+            hass.services.async_remove(DOMAIN, SERVICE_BATCH_CONTROL)
+            hass.services.async_remove(DOMAIN, SERVICE_PROFILE)
+    return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry):
+    await TopologyCache(hass, entry.entry_id).async_remove()
+    await StateSnapshotCache(hass, entry.entry_id).async_remove()
+
+
+async def async_migrate_entry(hass: HomeAssistant, entry: ConfigEntry):
+    """v1 -> v2：实体 unique_id 与设备标识加上配置条目前缀，以支持多网关"""
+    if entry.version == 1:
+        prefix = entry.entry_id
+
+        @callback
+        def _migrate_unique_id(entity_entry):
+            if entity_entry.unique_id.startswith(f"{prefix}_"):
+                return None
+            return {"new_unique_id": f"{prefix}_{entity_entry.unique_id}"}
+
+        await async_migrate_entries(hass, entry.entry_id, _migrate_unique_id)
+
+        device_registry = async_get(hass)
+        for device in async_entries_for_config_entry(device_registry, entry.entry_id):
+            new_identifiers = {
+                (domain, f"{prefix}_{identifier}")
+                if domain == DOMAIN and not identifier.startswith(f"{prefix}_")
+                else (domain, identifier)
+                for domain, identifier in device.identifiers
+            }
+            device_registry.async_update_device(device.id, new_identifiers=new_identifiers)
+
+        hass.config_entries.async_update_entry(entry, version=2)
+        _LOGGER.info(f"Migrated config entry {entry.entry_id} to version 2")
+    return True
+
+
+def _async_register_services(hass: HomeAssistant):
+    if hass.services.has_service(DOMAIN, SERVICE_REFRESH):
+        return
+
+    async def _async_handle_refresh(call: ServiceCall):
+        # 所有网关并发刷新
+        await asyncio.gather(
+            *(data["coordinator"].async_request_refresh() for data in hass.data[DOMAIN].values())
+        )
+
+    async def _async_handle_batch_control(call: ServiceCall) -> ServiceResponse:
+        data = _get_entry_data(hass, call)
+        # 所有指令并发下发，结束后只做一次全量刷新
+        results = await data["assistant"].batch_control(call.data["commands"])
+        await data["coordinator"].async_request_refresh()
+        succeeded = sum(result["success"] for result in results)
+        return {"succeeded": succeeded, "failed": len(results) - succeeded, "results": results}
+
+    async def _async_handle_profile(call: ServiceCall) -> ServiceResponse:
+        assistant = _get_entry_data(hass, call)["assistant"]
+        # cProfile 每个线程只能有一个，所有网关共用事件循环线程
+        if any(data["assistant"].profiler is not None for data in hass.data[DOMAIN].values()):
+            raise ServiceValidationError("a profile session is already running")
+        session = ProfileSession(call.data["cycles"], call.data["commands"])
+        try:
+            session.start()
+        except ValueError as e:
+            raise ServiceValidationError(f"cannot start profiler: {e}") from e
+        assistant.profiler = session
+        try:
+            await asyncio.wait_for(session.finished.wait(), call.data["timeout"])
+        except asyncio.TimeoutError:
+            _LOGGER.warning("profile session timed out after %ss", call.data["timeout"])
+        finally:
+            assistant.profiler = None
+            session.stop()
+        path = hass.config.path(f"{DOMAIN}_profile_{int(time.time())}.prof")
+        await hass.async_add_executor_job(session.dump, path)
+        summary = {**session.summary(), "profile_path": path}
+        _LOGGER.info("profile session finished: %s", summary)
+        return summary
+
+    hass.services.async_register(DOMAIN, SERVICE_REFRESH, _async_handle_refresh)
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_BATCH_CONTROL,
+        _async_handle_batch_control,
+        schema=BATCH_CONTROL_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_PROFILE,
+        _async_handle_profile,
+        schema=PROFILE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+
+def _get_entry_data(hass: HomeAssistant, call: ServiceCall):
+    """按 config_entry_id 选择网关，只有一个网关时可省略"""
+    entries = hass.data[DOMAIN]
+    entry_id = call.data.get("config_entry_id")
+    if entry_id is None and len(entries) == 1:
+        entry_id = next(iter(entries))
+    if entry_id not in entries:
+        raise ServiceValidationError("config_entry_id is required to select a loaded Dnake gateway")
+    return entries[entry_id]
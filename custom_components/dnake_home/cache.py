@@ -0,0 +1,58 @@
+import logging
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .core.constant import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+# 状态快照延迟写入时间（秒），期间多次变化只写一次；HA 退出时会立即写入
+STATE_SAVE_DELAY = 60
+
+# 判断拓扑是否变化时只比较这些字段，其余字段是设备的实时状态
+_TOPOLOGY_FIELDS = ("ty", "nm", "ch", "na")
+
+
+def get_topology(device_list):
+    return sorted(tuple(device.get(field) for field in _TOPOLOGY_FIELDS) for device in device_list or [])
+
+
+class TopologyCache:
+    """缓存网关 iot 信息与 speDev.info 设备列表，重启时无需等待网关即可创建实体"""
+
+    def __init__(self, hass: HomeAssistant, entry_id):
+        self._store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.topology")
+
+    async def async_load(self):
+        data = await self._store.async_load()
+        if not data or not data.get("iot_info") or not data.get("device_list"):
+            return None, None
+        return data["iot_info"], data["device_list"]
+
+    async def async_save(self, iot_info, device_list):
+        await self._store.async_save({"iot_info": iot_info, "device_list": device_list})
+
+    async def async_remove(self):
+        await self._store.async_remove()
+
+
+class StateSnapshotCache:
+    """保存最近一次的设备状态，重启后在首次轮询前恢复"""
+
+    def __init__(self, hass: HomeAssistant, entry_id):
+        self._store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.states")
+
+    async def async_load(self):
+        data = await self._store.async_load()
+        return data.get("states", []) if data else []
+
+    def async_delay_save(self, state_store):
+        self._store.async_delay_save(lambda: {"states": list(state_store.states.values())}, STATE_SAVE_DELAY)
+
+    async def async_save(self, state_store):
+        await self._store.async_save({"states": list(state_store.states.values())})
+
+    async def async_remove(self):
+        await self._store.async_remove()
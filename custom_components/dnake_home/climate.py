@@ -1,4 +1,3 @@
-import asyncio
 import logging
 
 from homeassistant.components.climate import ClimateEntity
@@ -10,14 +9,16 @@ from homeassistant.components.climate.const import (
     HVACMode,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import UnitOfTemperature
+from homeassistant.const import Platform, UnitOfTemperature
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from .core.assistant import assistant
-from .core.constant import DOMAIN, MANUFACTURER
+from .core.assistant import Assistant
+from .core.constant import DOMAIN, MANUFACTURER, STATE_FIELDS, DevType
+from .core.registry import DEVICE_TYPES
 from .core.utils import get_key_by_value
+from .entity import DnakeEntity
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -41,20 +42,8 @@ _air_condition_swing_table = {
 _air_condition_fan_table = {0: FAN_LOW, 1: FAN_MIDDLE, 2: FAN_HIGH}
 
 
-def load_climates(device_list):
-    air_conditions = [
-        DnakeAirCondition(device) for device in device_list if device.get("ty") == 16665
-    ]
-    _LOGGER.info(f"find air_condition num: {len(air_conditions)}")
-    assistant.entries["climate"] = air_conditions
-
-
-def update_climates_state(states):
-    climates = assistant.entries["climate"]
-    for climate in climates:
-        state = next((state for state in states if climate.is_hint_state(state)), None)
-        if state:
-            climate.update_state(state)
+_min_air_heater_temperature = 16
+_max_air_heater_temperature = 35
 
 
 async def async_setup_entry(
@@ -62,18 +51,20 @@ async def async_setup_entry(
         entry: ConfigEntry,
         async_add_entities: AddEntitiesCallback,
 ):
-    climate_list = assistant.entries["climate"]
+    assistant = hass.data[DOMAIN][entry.entry_id]["assistant"]
+    climate_list = assistant.entries.get(Platform.CLIMATE, [])
     if climate_list:
         async_add_entities(climate_list)
 
 
-class DnakeAirCondition(ClimateEntity):
+@DEVICE_TYPES.register(DevType.AirCondition.value, Platform.CLIMATE, STATE_FIELDS[DevType.AirCondition.value])
+@DEVICE_TYPES.register(
+    DevType.PanelAirCondition.value, Platform.CLIMATE, STATE_FIELDS[DevType.PanelAirCondition.value]
+)
+class DnakeAirCondition(DnakeEntity, ClimateEntity):
 
-    def __init__(self, device):
-        self._name = device.get("na")
-        self._dev_no = device.get("nm")
-        self._dev_ch = device.get("ch")
-        self._dev_type = device.get("ty")
+    def __init__(self, assistant: Assistant, device):
+        super().__init__(assistant, device)
         self._is_on = device.get("powerOn", 0) == 1
         self._hvac_mode = _air_condition_hvac_table.get(
             device.get("mode"), HVACMode.OFF
@@ -89,22 +80,18 @@ class DnakeAirCondition(ClimateEntity):
             "tempDesire", _min_air_condition_temperature
         )
 
-    def is_hint_state(self, state):
-        return state.get('devType') == self._dev_type and state.get("devNo") == self._dev_no and state.get(
-            "devCh") == self._dev_ch
-
     @property
     def unique_id(self):
-        return f"dnake_air_condition_{self._dev_no}_{self._dev_ch}"
+        return f"{self._assistant.uid}_dnake_air_condition_{self._dev_no}_{self._dev_ch}"
 
     @property
     def device_info(self):
         return DeviceInfo(
-            identifiers={(DOMAIN, f"air_condition_{self._dev_no}_{self._dev_ch}")},
+            identifiers={self._assistant.get_identifier(f"air_condition_{self._dev_no}_{self._dev_ch}")},
             name=self._name,
             manufacturer=MANUFACTURER,
             model="空调控制",
-            via_device=(DOMAIN, "gateway"),
+            via_device=self._assistant.gateway_identifier,
         )
 
     @property
@@ -117,14 +104,6 @@ class DnakeAirCondition(ClimateEntity):
                 | ClimateEntityFeature.FAN_MODE
         )
 
-    @property
-    def should_poll(self):
-        return False
-
-    @property
-    def name(self):
-        return self._name
-
     @property
     def min_temp(self):
         return _min_air_condition_temperature
@@ -174,8 +153,7 @@ class DnakeAirCondition(ClimateEntity):
         return list(_air_condition_fan_table.values())
 
     async def _async_turn_to(self, is_open: bool):
-        is_success = await self.hass.async_add_executor_job(
-            assistant.set_air_condition_power,
+        is_success = await self._assistant.set_air_condition_power(
             self._dev_no,
             self._dev_ch,
             is_open,
@@ -183,6 +161,8 @@ class DnakeAirCondition(ClimateEntity):
         if is_success:
             self._is_on = is_open
             self.async_write_ha_state()
+            self.async_confirm("powerOn", lambda state: (state.get("powerOn", 0) == 1) == is_open)
+        return is_success
 
     async def async_turn_on(self, **kwargs):
         await self._async_turn_to(True)
@@ -190,27 +170,36 @@ class DnakeAirCondition(ClimateEntity):
     async def async_turn_off(self, **kwargs):
         await self._async_turn_to(False)
 
+    async def _async_switch_hvac_mode(self, hvac_mode, mode):
+        is_success = await self._assistant.set_air_condition_hvac_mode(
+            self._dev_no,
+            self._dev_ch,
+            mode,
+        )
+        if is_success:
+            self._hvac_mode = hvac_mode
+            self.async_write_ha_state()
+            self.async_confirm("mode", lambda state: state.get("mode") == mode)
+        return is_success
+
     async def async_set_hvac_mode(self, hvac_mode):
         if hvac_mode == HVACMode.OFF:
             await self.async_turn_off()
         else:
-            switch_success = await self.hass.async_add_executor_job(
-                assistant.set_air_condition_hvac_mode,
-                self._dev_no,
-                self._dev_ch,
-                get_key_by_value(_air_condition_hvac_table, hvac_mode, 0),
-            )
-            if switch_success:
-                self._hvac_mode = hvac_mode
-                self.async_write_ha_state()
-            if not self._is_on:
-                await asyncio.sleep(2)
-                await self.async_turn_on()
+            mode = get_key_by_value(_air_condition_hvac_table, hvac_mode, 0)
+            if self._is_on:
+                # 已开机时只切换模式，由 async_confirm 确认
+                await self._async_switch_hvac_mode(hvac_mode, mode)
+                return
+            # 网关上报模式已切换后立即开机，不再固定等待 2 秒
+            await self._assistant.run_sequence(self._dev_no, self._dev_ch, [
+                (lambda: self._async_switch_hvac_mode(hvac_mode, mode), lambda state: state.get("mode") == mode),
+                (lambda: self._async_turn_to(True), None),
+            ])
 
     async def async_set_temperature(self, **kwargs):
         temperature = kwargs.get("temperature")
-        is_success = await self.hass.async_add_executor_job(
-            assistant.set_air_condition_temperature,
+        is_success = await self._assistant.set_air_condition_temperature(
             self._dev_no,
             self._dev_ch,
             temperature,
@@ -218,28 +207,31 @@ class DnakeAirCondition(ClimateEntity):
         if is_success:
             self._target_temperature = temperature
             self.async_write_ha_state()
+            self.async_confirm("tempDesire", lambda state: state.get("tempDesire") == temperature)
 
     async def async_set_swing_mode(self, swing_mode):
-        is_success = await self.hass.async_add_executor_job(
-            assistant.set_air_condition_swing_mode,
+        swing = get_key_by_value(_air_condition_swing_table, swing_mode, 0)
+        is_success = await self._assistant.set_air_condition_swing_mode(
             self._dev_no,
             self._dev_ch,
-            get_key_by_value(_air_condition_swing_table, swing_mode, 0),
+            swing,
         )
         if is_success:
             self._swing_mode = swing_mode
             self.async_write_ha_state()
+            self.async_confirm("swing", lambda state: state.get("swing") == swing)
 
     async def async_set_fan_mode(self, fan_mode):
-        is_success = await self.hass.async_add_executor_job(
-            assistant.set_air_condition_fan_mode,
+        speed = get_key_by_value(_air_condition_fan_table, fan_mode, 0)
+        is_success = await self._assistant.set_air_condition_fan_mode(
             self._dev_no,
             self._dev_ch,
-            get_key_by_value(_air_condition_fan_table, fan_mode, 0),
+            speed,
         )
         if is_success:
             self._fan_mode = fan_mode
             self.async_write_ha_state()
+            self.async_confirm("speed", lambda state: state.get("speed") == speed)
 
     def update_state(self, state):
         self._is_on = state.get("powerOn", 0) == 1
@@ -255,3 +247,122 @@ class DnakeAirCondition(ClimateEntity):
             "tempDesire", _min_air_condition_temperature
         )
         self.async_write_ha_state()
+
+
+@DEVICE_TYPES.register(DevType.AirHeater.value, Platform.CLIMATE, STATE_FIELDS[DevType.AirHeater.value])
+class DnakeAirHeater(DnakeEntity, ClimateEntity):
+
+    def __init__(self, assistant: Assistant, device):
+        super().__init__(assistant, device)
+        self._is_on = device.get("powerOn", 0) == 1
+        self._current_temperature = device.get("tempIndoor")
+        self._target_temperature = device.get("tempDesire", _min_air_heater_temperature)
+        self._valve = device.get("valve", 0)
+        self._error_code = device.get("errorCode", 0)
+        self._high_temp_protect = device.get("highTempProtect")
+        self._low_temp_protect_enable = device.get("lowTempProtectEnable", 0) == 1
+
+    @property
+    def unique_id(self):
+        return f"{self._assistant.uid}_dnake_air_heater_{self._dev_no}_{self._dev_ch}"
+
+    @property
+    def device_info(self):
+        return DeviceInfo(
+            identifiers={self._assistant.get_identifier(f"air_heater_{self._dev_no}_{self._dev_ch}")},
+            name=self._name,
+            manufacturer=MANUFACTURER,
+            model="地暖控制",
+            via_device=self._assistant.gateway_identifier,
+        )
+
+    @property
+    def supported_features(self):
+        return (
+                ClimateEntityFeature.TURN_ON
+                | ClimateEntityFeature.TURN_OFF
+                | ClimateEntityFeature.TARGET_TEMPERATURE
+        )
+
+    @property
+    def min_temp(self):
+        return _min_air_heater_temperature
+
+    @property
+    def max_temp(self):
+        return _max_air_heater_temperature
+
+    @property
+    def target_temperature_step(self):
+        return 1
+
+    @property
+    def temperature_unit(self):
+        return UnitOfTemperature.CELSIUS
+
+    @property
+    def current_temperature(self):
+        return self._current_temperature
+
+    @property
+    def target_temperature(self):
+        return self._target_temperature
+
+    @property
+    def hvac_mode(self):
+        return HVACMode.HEAT if self._is_on else HVACMode.OFF
+
+    @property
+    def hvac_modes(self):
+        return [HVACMode.OFF, HVACMode.HEAT]
+
+    @property
+    def extra_state_attributes(self):
+        return {
+            "valve": self._valve,
+            "error_code": self._error_code,
+            "high_temp_protect": self._high_temp_protect,
+            "low_temp_protect_enable": self._low_temp_protect_enable,
+        }
+
+    async def _async_turn_to(self, is_open: bool):
+        is_success = await self._assistant.set_air_heater_power(
+            self._dev_no,
+            self._dev_ch,
+            is_open,
+        )
+        if is_success:
+            self._is_on = is_open
+            self.async_write_ha_state()
+            self.async_confirm("powerOn", lambda state: (state.get("powerOn", 0) == 1) == is_open)
+
+    async def async_turn_on(self, **kwargs):
+        await self._async_turn_to(True)
+
+    async def async_turn_off(self, **kwargs):
+        await self._async_turn_to(False)
+
+    async def async_set_hvac_mode(self, hvac_mode):
+        await self._async_turn_to(hvac_mode != HVACMode.OFF)
+
+    async def async_set_temperature(self, **kwargs):
+        temperature = kwargs.get("temperature")
+        is_success = await self._assistant.set_air_heater_temperature(
+            self._dev_no,
+            self._dev_ch,
+            temperature,
+        )
+        if is_success:
+            self._target_temperature = temperature
+            self.async_write_ha_state()
+            self.async_confirm("tempDesire", lambda state: state.get("tempDesire") == temperature)
+
+    def update_state(self, state):
+        self._is_on = state.get("powerOn", 0) == 1
+        self._current_temperature = state.get("tempIndoor")
+        self._target_temperature = state.get("tempDesire", _min_air_heater_temperature)
+        self._valve = state.get("valve", 0)
+        self._error_code = state.get("errorCode", 0)
+        self._high_temp_protect = state.get("highTempProtect")
+        self._low_temp_protect_enable = state.get("lowTempProtectEnable", 0) == 1
+        self.async_write_ha_state()
@@ -1,11 +1,16 @@
 import voluptuous as vol
 from homeassistant import config_entries
 
+from .coordinator import DEFAULT_MAX_SCAN_INTERVAL
 from .core.constant import DOMAIN, TITLE
+from .core.assistant import DEFAULT_READ_MAX_AGE
+from .core.journal import DEFAULT_JOURNAL_SIZE
+from .core.scheduler import DEFAULT_MAX_CONCURRENCY
+from .core.tiers import DEFAULT_COLD_BUDGET, DEFAULT_HOT_BUDGET
 
 
 class DNakeConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
-    VERSION = 1
+    VERSION = 2
 
     async def async_step_user(self, user_input=None):
         if user_input:
@@ -16,6 +21,13 @@ class DNakeConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 "auth_username": "admin",
                 "auth_password": "123456",
                 "scan_interval": 10,
+                "max_scan_interval": DEFAULT_MAX_SCAN_INTERVAL,
+                "max_concurrency": DEFAULT_MAX_CONCURRENCY,
+                "hot_poll_budget": DEFAULT_HOT_BUDGET,
+                "cold_poll_budget": DEFAULT_COLD_BUDGET,
+                "read_max_age": DEFAULT_READ_MAX_AGE,
+                "journal_size": DEFAULT_JOURNAL_SIZE,
+                "state_event_sampling": 0,
             }
             return self.async_show_form(
                 step_id="user",
@@ -33,6 +45,27 @@ class DNakeConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                         vol.Optional(
                             "scan_interval", default=default_values["scan_interval"]
                         ): int,
+                        vol.Optional(
+                            "max_scan_interval", default=default_values["max_scan_interval"]
+                        ): int,
+                        vol.Optional(
+                            "max_concurrency", default=default_values["max_concurrency"]
+                        ): vol.All(int, vol.Range(min=1)),
+                        vol.Optional(
+                            "hot_poll_budget", default=default_values["hot_poll_budget"]
+                        ): vol.All(vol.Coerce(float), vol.Range(min=0.1)),
+                        vol.Optional(
+                            "cold_poll_budget", default=default_values["cold_poll_budget"]
+                        ): vol.All(vol.Coerce(float), vol.Range(min=0.01)),
+                        vol.Optional(
+                            "read_max_age", default=default_values["read_max_age"]
+                        ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                        vol.Optional(
+                            "journal_size", default=default_values["journal_size"]
+                        ): vol.All(int, vol.Range(min=1)),
+                        vol.Optional(
+                            "state_event_sampling", default=default_values["state_event_sampling"]
+                        ): vol.All(int, vol.Range(min=0)),
                     }
                 ),
             )
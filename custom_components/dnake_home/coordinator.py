@@ -0,0 +1,226 @@
+import asyncio
+import logging
+import time
+from datetime import timedelta
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.debounce import Debouncer
+from homeassistant.helpers.event import async_call_later, async_track_time_interval
+
+from .core.assistant import Assistant
+from .core.constant import DOMAIN
+from .core.profiler import profile_phase
+
+_LOGGER = logging.getLogger(__name__)
+
+# 手动刷新请求的防抖冷却时间（秒）
+REQUEST_REFRESH_COOLDOWN = 1
+# 热通道（最近控制或变化的通道）单独用 readDev 轮询的间隔
+HOT_POLL_INTERVAL = timedelta(seconds=1)
+# 连续多少次全量状态无变化后开始退避，每次间隔乘以退避系数
+IDLE_CYCLES_BEFORE_BACKOFF = 3
+IDLE_BACKOFF_FACTOR = 2
+DEFAULT_MAX_SCAN_INTERVAL = 120
+# 设备状态变化事件，按 event_sampling 抽样发布，默认不发布
+EVENT_STATE_CHANGED = f"{DOMAIN}_state_changed"
+
+
+class DnakeRefreshCoordinator:
+    """全量状态刷新调度：同一时刻只有一个 readAllDevState 在途，并发调用方共享结果
+
+    轮询分两层：最近控制或变化的热通道按 HOT_POLL_INTERVAL 单独 readDev，受热通道预算限制；
+    其余冷通道由全量刷新覆盖，长时间无变化则逐步退避到 max_interval，且不超过冷通道预算
+    """
+
+    def __init__(
+            self,
+            hass: HomeAssistant,
+            assistant: Assistant,
+            update_interval: timedelta,
+            max_interval: timedelta = timedelta(seconds=DEFAULT_MAX_SCAN_INTERVAL),
+            state_snapshot=None,
+            event_sampling=0,
+    ):
+        self.hass = hass
+        self.assistant = assistant
+        self.update_interval = update_interval
+        self.max_interval = max(max_interval, update_interval)
+        self.state_snapshot = state_snapshot
+        # 每 event_sampling 条状态变化发布一次事件，0 为不发布
+        self.event_sampling = event_sampling
+        self._event_counter = 0
+        self._idle_cycles = 0
+        self._refresh_task = None
+        self._unsub_refresh = None
+        self._unsub_hot_poll = None
+        self._hot_polling = False
+        self._hot_cursor = 0
+        self._shutdown = False
+        self._debouncer = Debouncer(
+            hass,
+            _LOGGER,
+            cooldown=REQUEST_REFRESH_COOLDOWN,
+            immediate=True,
+            function=self.async_refresh,
+        )
+        self._remove_command_listener = assistant.add_command_listener(self.async_note_activity)
+        self._remove_tiers_listener = assistant.tiers.add_listener(self._async_start_hot_poll)
+        self._remove_journal_listener = None
+        if event_sampling:
+            self._remove_journal_listener = assistant.journal.add_listener(self._async_publish_change)
+
+    async def async_refresh(self):
+        """刷新设备状态，若已有刷新在途则等待同一次请求完成"""
+        if self._refresh_task is None:
+            if not self.assistant.tiers.cold_budget.try_acquire():
+                _LOGGER.debug("cold poll budget exhausted, skip refresh")
+                if not self._shutdown and self._unsub_refresh is None:
+                    self._schedule_refresh()
+                return
+            self._refresh_task = self.hass.async_create_task(self._async_refresh_states())
+            self._refresh_task.add_done_callback(self._on_refresh_done)
+        await asyncio.shield(self._refresh_task)
+
+    async def async_request_refresh(self):
+        """防抖的刷新请求，供服务调用和实体控制后使用"""
+        await self._debouncer.async_call()
+
+    @callback
+    def _on_refresh_done(self, task):
+        self._refresh_task = None
+        if not self._shutdown:
+            self._schedule_refresh()
+
+    @callback
+    def async_note_activity(self):
+        """有控制指令下发时结束空闲退避；被控制的通道本身由热通道轮询负责"""
+        was_backing_off = self._idle_cycles >= IDLE_CYCLES_BEFORE_BACKOFF
+        self._idle_cycles = 0
+        if was_backing_off and self._refresh_task is None and not self._shutdown:
+            self._schedule_refresh()
+
+    @property
+    def current_interval(self) -> timedelta:
+        if not self.assistant.available:
+            # 网关不可用时按熔断冷却时间探测
+            return timedelta(seconds=self.assistant.breaker.reset_timeout)
+        backoff_cycles = self._idle_cycles - IDLE_CYCLES_BEFORE_BACKOFF + 1
+        interval = self.update_interval
+        if backoff_cycles > 0:
+            interval = min(self.update_interval * IDLE_BACKOFF_FACTOR ** backoff_cycles, self.max_interval)
+        # 不超过冷通道的全量刷新预算
+        return max(interval, timedelta(seconds=1 / self.assistant.tiers.cold_budget.rate))
+
+    @callback
+    def _schedule_refresh(self):
+        # 上一次刷新结束后才安排下一次，慢网关不会导致请求堆积
+        if self._unsub_refresh:
+            self._unsub_refresh()
+        self._unsub_refresh = async_call_later(
+            self.hass, self.current_interval, self._async_handle_refresh_interval
+        )
+
+    async def _async_handle_refresh_interval(self, now=None):
+        self._unsub_refresh = None
+        await self.async_refresh()
+
+    async def _async_refresh_states(self):
+        if not self.assistant.available and not await self.assistant.probe():
+            _LOGGER.debug("gateway unavailable, skip refresh")
+            return
+        _LOGGER.debug("update all device state")
+        start = time.monotonic()
+        states = await self.assistant.read_all_dev_state()
+        # 与上次状态比对，只有发生变化的设备才会更新并写入 HA
+        profiler = self.assistant.profiler
+        with profile_phase(profiler, "dispatch"):
+            changed = self.assistant.states.update(states)
+        if profiler is not None:
+            profiler.note_cycle()
+        self.assistant.metrics.record_refresh(time.monotonic() - start, self.assistant.states.last_dispatch_count)
+        is_active = False
+        # 变化明细记录在 assistant.journal 中（见诊断信息），这里只记录数量
+        _LOGGER.debug("%s device states changed", len(changed))
+        for key, changes in changed.items():
+            # 首次出现（None）与被 invalidate 但相关字段未变（空字典）的设备不算状态变化；发生变化的通道转为热通道
+            if changes:
+                is_active = True
+                self.assistant.tiers.mark_changed(key[1], key[2])
+        if changed and self.state_snapshot:
+            self.state_snapshot.async_delay_save(self.assistant.states)
+        if is_active:
+            self._idle_cycles = 0
+        elif states is not None:
+            self._idle_cycles += 1
+
+    @callback
+    def _async_publish_change(self, timestamp, key, changes):
+        self._event_counter += 1
+        if self._event_counter < self.event_sampling:
+            return
+        self._event_counter = 0
+        dev_type, dev_no, dev_ch = key
+        self.hass.bus.async_fire(
+            EVENT_STATE_CHANGED,
+            {
+                "config_entry_id": self.assistant.uid,
+                "dev_type": dev_type,
+                "dev_no": dev_no,
+                "dev_ch": dev_ch,
+                "changes": {field: {"old": old, "new": new} for field, (old, new) in changes.items()},
+            },
+        )
+
+    @callback
+    def _async_start_hot_poll(self):
+        # 每次有通道转为热通道都会调用，轮询已在运行时忽略
+        if self._unsub_hot_poll is None and not self._shutdown:
+            self._unsub_hot_poll = async_track_time_interval(self.hass, self._async_poll_hot, HOT_POLL_INTERVAL)
+
+    @callback
+    def _async_stop_hot_poll(self):
+        if self._unsub_hot_poll:
+            self._unsub_hot_poll()
+            self._unsub_hot_poll = None
+
+    async def _async_poll_hot(self, now=None):
+        # 上一轮请求未返回时跳过本轮，避免请求堆积
+        if self._hot_polling:
+            return
+        tiers = self.assistant.tiers
+        channels = tiers.hot_channels()
+        if not channels:
+            self._async_stop_hot_poll()
+            return
+        if not self.assistant.available:
+            return
+        # 预算不足以覆盖全部热通道时轮流读取其中一部分
+        count = tiers.hot_budget.take(len(channels))
+        if not count:
+            return
+        start = self._hot_cursor % len(channels)
+        selected = (channels[start:] + channels[:start])[:count]
+        self._hot_cursor = start + count
+        self._hot_polling = True
+        try:
+            states = await asyncio.gather(
+                *(self.assistant.read_dev_state(dev_no, dev_ch) for dev_no, dev_ch in selected)
+            )
+        finally:
+            self._hot_polling = False
+        for (dev_no, dev_ch), state in zip(selected, states):
+            if state and state.get("result") == "ok" and self.assistant.states.update_channel(dev_no, dev_ch, state):
+                tiers.mark_changed(dev_no, dev_ch)
+
+    @callback
+    def async_shutdown(self):
+        self._shutdown = True
+        self._remove_command_listener()
+        self._remove_tiers_listener()
+        if self._remove_journal_listener:
+            self._remove_journal_listener()
+        self._async_stop_hot_poll()
+        if self._unsub_refresh:
+            self._unsub_refresh()
+            self._unsub_refresh = None
+        self._debouncer.async_cancel()
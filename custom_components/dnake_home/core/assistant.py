@@ -1,23 +1,103 @@
+import asyncio
+import inspect
 import logging
-import requests
-
-from .constant import Action, Cmd, Power
+import random
+import time
+
+import aiohttp
+
+from .breaker import CircuitBreaker
+from .constant import DOMAIN, Action, Cmd, Power
+from .decoder import loads
+from .journal import DEFAULT_JOURNAL_SIZE, StateJournal
+from .metrics import GatewayMetrics
+from .profiler import profile_phase
+from .registry import DEVICE_TYPES
+from .scheduler import DEFAULT_MAX_CONCURRENCY, CommandScheduler
+from .store import DeviceStateStore
+from .tiers import DEFAULT_COLD_BUDGET, DEFAULT_HOT_BUDGET, PollTiers
 from .utils import encode_auth, get_uuid
 
 _LOGGER = logging.getLogger(__name__)
 
+# 请求超时，避免网关挂起或重启时请求无限等待
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=10, connect=3)
+# 幂等读请求（readDev、readAllDevState 等）的重试次数与退避参数（秒）
+READ_RETRIES = 2
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 4
+# 最近一次全量刷新距今不超过该时间（秒）且之后没有控制过该通道时，readDev 直接使用快照中的状态
+DEFAULT_READ_MAX_AGE = 0.5
+# 多步控制中等待设备状态时的 readDev 间隔与每一步的最长等待时间（秒）
+SEQUENCE_POLL_INTERVAL = 0.25
+SEQUENCE_STEP_TIMEOUT = 2
+# batch_control 允许调用的控制指令（Assistant 方法名），params 作为关键字参数传入
+BATCH_COMMANDS = (
+    "turn_to",
+    "stop",
+    "set_level",
+    "set_air_condition_power",
+    "set_air_condition_temperature",
+    "set_air_condition_hvac_mode",
+    "set_air_condition_fan_mode",
+    "set_air_condition_swing_mode",
+    "set_air_fresh_power",
+    "set_air_fresh_speed",
+    "set_air_fresh_mode",
+    "set_air_heater_power",
+    "set_air_heater_temperature",
+    "set_air_heater_high_temp_protect",
+    "set_air_heater_low_temp_protect",
+)
+
 
 class __AssistantCore:
-    def __init__(self):
+    def __init__(
+            self,
+            uid,
+            max_concurrency=DEFAULT_MAX_CONCURRENCY,
+            hot_budget=DEFAULT_HOT_BUDGET,
+            cold_budget=DEFAULT_COLD_BUDGET,
+            read_max_age=DEFAULT_READ_MAX_AGE,
+            journal_size=DEFAULT_JOURNAL_SIZE,
+    ):
+        # uid 用于区分多个网关（配置条目 id）
+        self.uid = uid
         self.gw_ip = None
         self.auth = None
         self.from_device = None
         self.to_device = None
+        self.session = None
         self.entries = {}
+        self.journal = StateJournal(journal_size)
+        self.states = DeviceStateStore(DEVICE_TYPES, self.journal)
+        self.scheduler = CommandScheduler(max_concurrency)
+        self.breaker = CircuitBreaker()
+        self.metrics = GatewayMetrics()
+        self.tiers = PollTiers(hot_budget, cold_budget)
+        # 按需采样时的 ProfileSession，平时为 None
+        self.profiler = None
+        self.read_max_age = read_max_age
+        # 最近一次成功的 readAllDevState 发出时间，以及各通道最近一次控制的发出时间
+        self.bulk_read_at = None
+        self._commanded_at = {}
+        self._headers = None
+        self._request_url = None
+        self._coalesced_actions = {}
+        # 各通道进行中的 readDev：(发出时间, task)
+        self._inflight_reads = {}
+        self._command_listeners = []
+
+    def bind_session(self, session: aiohttp.ClientSession):
+        # 复用同一个 keep-alive 连接池，避免每次请求重新建立 TCP 连接
+        self.session = session
 
     def bind_auth_info(self, gw_ip, auth_name, auth_psw):
         self.gw_ip = gw_ip
         self.auth = encode_auth(auth_name, auth_psw)
+        # 请求头与请求地址只计算一次
+        self._headers = self._get_header()
+        self._request_url = self._get_url("/route.cgi?api=request")
         _LOGGER.info(f"bind auth info: ip={self.gw_ip},auth={self.auth}")
 
     def bind_iot_info(self, iot_device_name, gw_iot_name):
@@ -25,6 +105,27 @@ class __AssistantCore:
         self.to_device = gw_iot_name
         _LOGGER.info(f"bind iot info: from={self.from_device},to={self.to_device}")
 
+    @property
+    def gateway_identifier(self):
+        return DOMAIN, f"{self.uid}_gateway"
+
+    def get_identifier(self, name):
+        """生成带网关前缀的设备标识，多个网关下的同号设备互不冲突"""
+        return DOMAIN, f"{self.uid}_{name}"
+
+    @property
+    def available(self):
+        """熔断器打开时网关视为不可用"""
+        return self.breaker.is_closed
+
+    def add_availability_listener(self, listener):
+        return self.breaker.add_listener(listener)
+
+    def add_command_listener(self, listener):
+        """注册控制指令回调（用于自适应轮询），返回取消注册函数"""
+        self._command_listeners.append(listener)
+        return lambda: self._command_listeners.remove(listener)
+
     def _get_url(self, path):
         return f"http://{self.gw_ip}{path}"
 
@@ -35,44 +136,180 @@ class __AssistantCore:
             "Authorization": f"Basic {self.auth}",
         }
 
-    def get(self, path):
+    async def _request(self, method, url, action, retries=0, **kwargs):
+        """发送请求并解析 JSON；熔断器打开时直接返回 None，失败按带抖动的指数退避重试"""
+        for attempt in range(retries + 1):
+            if not self.breaker.allow_request():
+                _LOGGER.debug("circuit breaker open, skip request: %s", url)
+                return None
+            start = time.monotonic()
+            try:
+                async with self.scheduler.gateway_slot():
+                    async with self.session.request(
+                            method, url, headers=self._headers, timeout=REQUEST_TIMEOUT, **kwargs
+                    ) as resp:
+                        resp.raise_for_status()
+                        result = await self._read_json(resp)
+                self.breaker.record_success()
+                self.metrics.record_request(
+                    action, time.monotonic() - start, isinstance(result, dict) and result.get("result", "ok") == "ok"
+                )
+                if self.profiler is not None:
+                    self.profiler.record("request", time.monotonic() - start)
+                return result
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                self.breaker.record_failure()
+                self.metrics.record_request(action, time.monotonic() - start, False)
+                if attempt >= retries:
+                    raise
+                delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+                _LOGGER.debug("request fail, retry in %.2fs: url=%s,err=%s", delay, url, e)
+                await asyncio.sleep(delay)
+            except BaseException:
+                # 被取消等：放行的探测请求没有结果，不能让熔断器停在半开状态
+                self.breaker.record_aborted()
+                raise
+
+    async def _read_json(self, resp):
+        body = await resp.read()
+        with profile_phase(self.profiler, "decode"):
+            return loads(body) if body.strip() else None
+
+    async def get(self, path, retries=READ_RETRIES):
         try:
-            url = self._get_url(path)
-            resp = requests.get(url, headers=self._get_header())
-            resp.raise_for_status()
-            return resp.json()
-        except requests.exceptions.RequestException as e:
+            return await self._request("GET", self._get_url(path), path, retries=retries)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
             _LOGGER.error("get error: path=%s,err=%s", path, e)
             return None
 
-    def post(self, data: dict):
+    async def post(self, data: dict, retries=0):
         try:
-            url = self._get_url("/route.cgi?api=request")
             data["uuid"] = get_uuid()
-            resp = requests.post(
-                url,
-                headers=self._get_header(),
+            return await self._request(
+                "POST",
+                self._request_url,
+                data.get("action"),
+                retries=retries,
                 json={
                     "fromDev": self.from_device,
                     "toDev": self.to_device,
                     "data": data,
                 },
             )
-            resp.raise_for_status()
-            return resp.json()
-        except requests.exceptions.RequestException as e:
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
             _LOGGER.error("post error: data=%s,err=%s", data, e)
             return None
 
-    def do_action(self, data: dict):
-        resp = self.post(data)
+    async def probe(self):
+        """轻量探测网关是否恢复，只有熔断冷却结束后才会真正发出请求"""
+        return await self.get("/smart/iot.info", retries=0) is not None
+
+    async def do_action(self, data: dict):
+        # 同一设备的指令按顺序执行（如 setMode 与 powerOn），不同设备并行
+        dev_key = (data.get("devNo"), data.get("devCh"))
+        start = time.monotonic()
+        async with self.scheduler.device_slot(dev_key):
+            self._commanded_at[dev_key] = time.monotonic()
+            resp = await self.post(data)
+        if self.profiler is not None:
+            # 含同一设备排队与网关并发名额的等待
+            self.profiler.record("command", time.monotonic() - start)
+            self.profiler.note_command()
+        # 控制后设备本地状态可能与网关不一致，下次全量刷新强制重新分发；该通道转为热通道单独轮询
+        self.states.invalidate(data.get("devNo"), data.get("devCh"))
+        self.tiers.mark_commanded(data.get("devNo"), data.get("devCh"))
+        for listener in self._command_listeners:
+            listener()
         return resp and resp.get("result") == "ok"
 
+    async def do_coalesced_action(self, data: dict):
+        """合并同一设备同一指令的连续控制，例如拖动温度或窗帘位置滑块
+
+        以 (devNo, devCh, cmd, oper) 为键：没有在途请求时立即发送；
+        在途期间到达的新值只保留最后一个，旧值直接丢弃。所有调用方都拿到最终值的执行结果。
+        """
+        key = (data.get("devNo"), data.get("devCh"), data.get("cmd"), data.get("oper"))
+        pending = self._coalesced_actions.get(key)
+        if pending is None:
+            pending = {"data": data}
+            pending["task"] = asyncio.create_task(self._run_coalesced_action(key, pending))
+            self._coalesced_actions[key] = pending
+        else:
+            _LOGGER.debug("coalesce action: key=%s,drop=%s", key, pending["data"])
+            pending["data"] = data
+        return await asyncio.shield(pending["task"])
+
+    async def _run_coalesced_action(self, key, pending):
+        try:
+            while True:
+                data = pending["data"]
+                result = await self.do_action(data)
+                if pending["data"] is data:
+                    return result
+        finally:
+            self._coalesced_actions.pop(key, None)
+
 
 class Assistant(__AssistantCore):
 
-    def query_iot_info(self):
-        iot_info = self.get("/smart/iot.info")
+    async def wait_for_state(self, dev_no, dev_ch, predicate, timeout=SEQUENCE_STEP_TIMEOUT):
+        """以 SEQUENCE_POLL_INTERVAL 间隔 readDev，直到 predicate(state) 成立或超过 timeout
+
+        返回 (是否满足, 最后一次读到的状态)，设备一确认就返回，不做固定等待
+        """
+        deadline = time.monotonic() + timeout
+        last_state = None
+        while True:
+            state = await self.read_dev_state(dev_no, dev_ch)
+            if state and state.get("result") == "ok":
+                last_state = state
+                if predicate(state):
+                    return True, state
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False, last_state
+            await asyncio.sleep(min(SEQUENCE_POLL_INTERVAL, remaining))
+
+    async def run_sequence(self, dev_no, dev_ch, steps, timeout=SEQUENCE_STEP_TIMEOUT):
+        """按顺序执行同一设备的多步控制，例如先切换模式再开机
+
+        每一步为 (send, until)：send 是返回是否成功的协程函数；until 为可选的状态条件，
+        给出时等到设备状态满足（最多 timeout 秒）再执行下一步，否则网关确认后立即执行下一步。
+        任一步失败即中止，返回是否全部成功。
+        """
+        for send, until in steps:
+            if not await send():
+                return False
+            if until is not None:
+                matched, _ = await self.wait_for_state(dev_no, dev_ch, until, timeout)
+                if not matched:
+                    _LOGGER.debug("device %s_%s not confirmed in %ss, continue sequence", dev_no, dev_ch, timeout)
+        return True
+
+    async def batch_control(self, commands):
+        """并发下发一批控制指令，返回与 commands 顺序一致的结果列表
+
+        每条指令为 {"dev_no", "dev_ch", "command", "params"}。同时在途的请求数由 gateway_slot 限制，
+        同一设备的多条指令仍按提交顺序执行；单条指令失败不影响其他指令。
+        """
+        return await asyncio.gather(*(self._run_batch_command(command) for command in commands))
+
+    async def _run_batch_command(self, command):
+        result = {"dev_no": command["dev_no"], "dev_ch": command["dev_ch"], "command": command["command"]}
+        if command["command"] not in BATCH_COMMANDS:
+            return {**result, "success": False, "error": "unsupported command"}
+        method = getattr(self, command["command"])
+        args = (command["dev_no"], command["dev_ch"])
+        params = command.get("params") or {}
+        try:
+            inspect.signature(method).bind(*args, **params)
+        except TypeError as e:
+            # params 与指令的参数不匹配
+            return {**result, "success": False, "error": str(e)}
+        return {**result, "success": bool(await method(*args, **params))}
+
+    async def query_iot_info(self):
+        iot_info = await self.get("/smart/iot.info")
         if iot_info:
             return {
                 "iot_device_name": iot_info.get("iotDeviceName"),
@@ -82,8 +319,8 @@ class Assistant(__AssistantCore):
             _LOGGER.error("query iot info fail")
             return None
 
-    def query_device_list(self):
-        device_info = self.get("/smart/speDev.info")
+    async def query_device_list(self):
+        device_info = await self.get("/smart/speDev.info")
         if device_info:
             device_array = device_info.get("dl", [])
             return device_array
@@ -91,31 +328,71 @@ class Assistant(__AssistantCore):
             _LOGGER.error("query device info fail")
             return None
 
-    def read_dev_state(self, dev_no, dev_ch):
-        state_info = self.post(
+    async def read_dev_state(self, dev_no, dev_ch):
+        """读取单个通道的状态
+
+        同一通道并发的读取共享一次 readDev 请求（只共享最近一次控制之后发出的请求）；
+        最近一次全量刷新足够新（不超过 read_max_age）且之后没有控制过该通道时，直接返回快照中的状态，不再请求网关。
+        """
+        state = self._get_fresh_snapshot_state(dev_no, dev_ch)
+        if state is not None:
+            return state
+        key = (dev_no, dev_ch)
+        inflight = self._inflight_reads.get(key)
+        commanded_at = self._commanded_at.get(key)
+        if inflight is None or (commanded_at is not None and inflight[0] <= commanded_at):
+            # 进行中的读取发出于最近一次控制之前，结果可能不反映控制，另发一次
+            task = asyncio.create_task(self._read_dev_state(dev_no, dev_ch))
+            inflight = self._inflight_reads[key] = (time.monotonic(), task)
+
+            def _done(_):
+                # 旧的读取晚于新读取完成时，不能移除新读取
+                if self._inflight_reads.get(key) is inflight:
+                    del self._inflight_reads[key]
+
+            task.add_done_callback(_done)
+        return await asyncio.shield(inflight[1])
+
+    def _get_fresh_snapshot_state(self, dev_no, dev_ch):
+        if self.bulk_read_at is None or time.monotonic() - self.bulk_read_at > self.read_max_age:
+            return None
+        commanded_at = self._commanded_at.get((dev_no, dev_ch))
+        if commanded_at is not None and commanded_at >= self.bulk_read_at:
+            # 快照早于最近一次控制，不能反映控制结果
+            return None
+        state = self.states.get_channel(dev_no, dev_ch)
+        return {**state, "result": "ok"} if state else None
+
+    async def _read_dev_state(self, dev_no, dev_ch):
+        state_info = await self.post(
             {
                 "action": Action.ReadDev.value,
                 "devNo": dev_no,
                 "devCh": dev_ch,
-            }
+            },
+            retries=READ_RETRIES,
         )
         if state_info:
             return state_info
-        else:
-            _LOGGER.error(f"query device status fail: devNo={dev_no},devCh={dev_ch}")
-            return None
-
-    def read_all_dev_state(self):
-        state_info = self.post({"action": Action.ReadAllDevState.value})
+        # 熔断器打开时请求被跳过，不必每次都记错误日志（打开熔断的那次失败已由 post 记录）
+        if self.available:
+            _LOGGER.error("query device status fail: devNo=%s,devCh=%s", dev_no, dev_ch)
+        return None
+
+    async def read_all_dev_state(self):
+        """读取所有设备状态，调用方应在拿到结果后立即写入 states，bulk_read_at 才与快照一致"""
+        start = time.monotonic()
+        state_info = await self.post({"action": Action.ReadAllDevState.value}, retries=READ_RETRIES)
         if state_info:
+            self.bulk_read_at = start
             return state_info.get("devList")
-        else:
+        if self.available:
             _LOGGER.error("query all device status fail")
-            return None
+        return None
 
-    def turn_to(self, dev_no, dev_ch, is_open: bool):
+    async def turn_to(self, dev_no, dev_ch, is_open: bool):
         cmd = Cmd.On if is_open else Cmd.Off
-        return self.do_action(
+        return await self.do_action(
             {
                 "action": Action.CtrlDev.value,
                 "cmd": cmd.value,
@@ -124,8 +401,8 @@ class Assistant(__AssistantCore):
             }
         )
 
-    def stop(self, dev_no, dev_ch):
-        return self.do_action(
+    async def stop(self, dev_no, dev_ch):
+        return await self.do_action(
             {
                 "action": Action.CtrlDev.value,
                 "cmd": Cmd.Stop.value,
@@ -134,8 +411,8 @@ class Assistant(__AssistantCore):
             }
         )
 
-    def set_level(self, dev_no, dev_ch, level: int):
-        return self.do_action(
+    async def set_level(self, dev_no, dev_ch, level: int):
+        return await self.do_coalesced_action(
             {
                 "action": Action.CtrlDev.value,
                 "cmd": Cmd.Level.value,
@@ -145,9 +422,9 @@ class Assistant(__AssistantCore):
             }
         )
 
-    def set_air_condition_power(self, dev_no, dev_ch, is_open: bool):
+    async def set_air_condition_power(self, dev_no, dev_ch, is_open: bool):
         power = Power.On if is_open else Power.Off
-        return self.do_action(
+        return await self.do_action(
             {
                 "action": Action.CtrlDev.value,
                 "cmd": Cmd.AirCondition.value,
@@ -157,8 +434,8 @@ class Assistant(__AssistantCore):
             }
         )
 
-    def set_air_condition_temperature(self, dev_no, dev_ch, temp: int):
-        return self.do_action(
+    async def set_air_condition_temperature(self, dev_no, dev_ch, temp: int):
+        return await self.do_coalesced_action(
             {
                 "action": Action.CtrlDev.value,
                 "cmd": Cmd.AirCondition.value,
@@ -169,8 +446,8 @@ class Assistant(__AssistantCore):
             }
         )
 
-    def set_air_condition_hvac_mode(self, dev_no, dev_ch, mode: int):
-        return self.do_action(
+    async def set_air_condition_hvac_mode(self, dev_no, dev_ch, mode: int):
+        return await self.do_action(
             {
                 "action": Action.CtrlDev.value,
                 "cmd": Cmd.AirCondition.value,
@@ -181,8 +458,8 @@ class Assistant(__AssistantCore):
             }
         )
 
-    def set_air_condition_fan_mode(self, dev_no, dev_ch, mode: int):
-        return self.do_action(
+    async def set_air_condition_fan_mode(self, dev_no, dev_ch, mode: int):
+        return await self.do_action(
             {
                 "action": Action.CtrlDev.value,
                 "cmd": Cmd.AirCondition.value,
@@ -193,8 +470,8 @@ class Assistant(__AssistantCore):
             }
         )
 
-    def set_air_condition_swing_mode(self, dev_no, dev_ch, mode: int):
-        return self.do_action(
+    async def set_air_condition_swing_mode(self, dev_no, dev_ch, mode: int):
+        return await self.do_action(
             {
                 "action": Action.CtrlDev.value,
                 "cmd": Cmd.AirCondition.value,
@@ -205,10 +482,10 @@ class Assistant(__AssistantCore):
             }
         )
     
-    def set_air_fresh_power(self, dev_no, dev_ch, is_open: bool):
+    async def set_air_fresh_power(self, dev_no, dev_ch, is_open: bool):
         """控制新风系统的电源开关"""
         power = Power.On if is_open else Power.Off
-        return self.do_action(
+        return await self.do_action(
             {
                 "action": Action.CtrlDev.value,
                 "cmd": Cmd.AirFresh.value,
@@ -218,9 +495,9 @@ class Assistant(__AssistantCore):
             }
         )
 
-    def set_air_fresh_speed(self, dev_no, dev_ch, speed: int):
+    async def set_air_fresh_speed(self, dev_no, dev_ch, speed: int):
         """设置新风的风速"""
-        return self.do_action(
+        return await self.do_coalesced_action(
             {
                 "action": Action.CtrlDev.value,
                 "cmd": Cmd.AirFresh.value,
@@ -231,9 +508,9 @@ class Assistant(__AssistantCore):
             }
         )
 
-    def set_air_fresh_mode(self, dev_no, dev_ch, mode: int):
+    async def set_air_fresh_mode(self, dev_no, dev_ch, mode: int):
         """设置新风的工作模式"""
-        return self.do_action(
+        return await self.do_action(
             {
                 "action": Action.CtrlDev.value,
                 "cmd": Cmd.AirFresh.value,
@@ -244,10 +521,10 @@ class Assistant(__AssistantCore):
             }
         )
 
-    def set_air_heater_power(self, dev_no, dev_ch, is_open: bool):
+    async def set_air_heater_power(self, dev_no, dev_ch, is_open: bool):
         """控制地暖的电源开关"""
         power = Power.On if is_open else Power.Off
-        return self.do_action(
+        return await self.do_action(
             {
                 "action": Action.CtrlDev.value,
                 "cmd": Cmd.AirHeater.value,
@@ -257,9 +534,9 @@ class Assistant(__AssistantCore):
             }
         )
 
-    def set_air_heater_temperature(self, dev_no, dev_ch, temp: int):
+    async def set_air_heater_temperature(self, dev_no, dev_ch, temp: int):
         """设置地暖的温度"""
-        return self.do_action(
+        return await self.do_coalesced_action(
             {
                 "action": Action.CtrlDev.value,
                 "cmd": Cmd.AirHeater.value,
@@ -270,9 +547,9 @@ class Assistant(__AssistantCore):
             }
         )
 
-    def set_air_heater_high_temp_protect(self, dev_no, dev_ch, temp: int):
+    async def set_air_heater_high_temp_protect(self, dev_no, dev_ch, temp: int):
         """设置地暖的高温保护"""
-        return self.do_action(
+        return await self.do_action(
             {
                 "action": Action.CtrlDev.value,
                 "cmd": Cmd.AirHeater.value,
@@ -283,10 +560,10 @@ class Assistant(__AssistantCore):
             }
         )
 
-    def set_air_heater_low_temp_protect(self, dev_no, dev_ch, enable: bool):
+    async def set_air_heater_low_temp_protect(self, dev_no, dev_ch, enable: bool):
         """启用或禁用地暖的低温保护"""
         param = 1 if enable else 0  # 1表示启用，0表示禁用
-        return self.do_action(
+        return await self.do_action(
             {
                 "action": Action.CtrlDev.value,
                 "cmd": Cmd.AirHeater.value,
@@ -296,8 +573,3 @@ class Assistant(__AssistantCore):
                 "devCh": dev_ch,
             }
         )
-
-
-
-
-assistant = Assistant()
@@ -0,0 +1,66 @@
+import logging
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """网关熔断器：连续失败达到阈值后停止请求，冷却后放行一个探测请求，成功即恢复"""
+
+    def __init__(self, failure_threshold=5, reset_timeout=10):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._listeners = []
+
+    @property
+    def is_closed(self):
+        return self.state == STATE_CLOSED
+
+    def add_listener(self, listener):
+        """注册熔断状态变化回调（打开/恢复），返回取消注册函数"""
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    def allow_request(self):
+        if self.state == STATE_CLOSED:
+            return True
+        if self.state == STATE_OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            # 冷却结束，只放行一个探测请求
+            self.state = STATE_HALF_OPEN
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        if self.state != STATE_CLOSED:
+            _LOGGER.info("gateway is reachable again, close circuit breaker")
+            self._set_state(STATE_CLOSED)
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == STATE_HALF_OPEN or (
+                self.state == STATE_CLOSED and self.failures >= self.failure_threshold
+        ):
+            _LOGGER.warning("gateway failed %s times, open circuit breaker", self.failures)
+            self._opened_at = time.monotonic()
+            self._set_state(STATE_OPEN)
+
+    def record_aborted(self):
+        """请求没有得出结果就退出（如被取消）时调用：半开状态下重新进入冷却，避免一直停在半开"""
+        if self.state == STATE_HALF_OPEN:
+            self._opened_at = time.monotonic()
+            self._set_state(STATE_OPEN)
+
+    def _set_state(self, state):
+        was_closed = self.is_closed
+        self.state = state
+        if was_closed != self.is_closed:
+            for listener in list(self._listeners):
+                listener()
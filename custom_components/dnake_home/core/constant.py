@@ -33,3 +33,34 @@ class Power(Enum):
     On = "powerOn"
     Off = "powerOff"
 
+
+
+class DevType(Enum):
+    # 灯
+    Light = 256
+    # 窗帘
+    Cover = 514
+    # 空调
+    AirCondition = 16665
+    # 新风
+    AirFresh = 16926
+    # 面板空调
+    PanelAirCondition = 769
+    # 面板新风
+    PanelAirFresh = 1793
+    # 地暖
+    AirHeater = 2048
+
+
+# 各设备类型状态中与实体相关的字段，平台模块注册设备类型时使用；状态表只保存这些字段
+STATE_FIELDS = {
+    DevType.Light.value: ("state",),
+    DevType.Cover.value: ("level",),
+    DevType.AirCondition.value: ("powerOn", "mode", "speed", "tempDesire", "tempIndoor", "swing"),
+    DevType.PanelAirCondition.value: ("powerOn", "mode", "speed", "tempDesire", "tempIndoor", "swing"),
+    DevType.AirFresh.value: ("powerOn", "speed", "errorCode", "pm25"),
+    # 面板新风不上报 pm25，状态中缺失的字段按缺失处理
+    DevType.PanelAirFresh.value: ("powerOn", "speed", "errorCode", "pm25"),
+    DevType.AirHeater.value: ("powerOn", "tempDesire", "tempIndoor", "valve", "errorCode", "highTempProtect",
+                              "lowTempProtectEnable"),
+}
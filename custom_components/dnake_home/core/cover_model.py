@@ -0,0 +1,85 @@
+import time
+
+# 窗帘 level 的全程范围 0 - 254
+FULL_TRAVEL = 254
+# 学习行程时间要求的最小移动距离（level），距离太短时读数误差占比过大
+MIN_LEARN_DISTANCE = 30
+# 新观测在学习值中的权重
+LEARN_ALPHA = 0.3
+
+
+class CoverTravelModel:
+    """根据观测到的移动学习窗帘全程打开、关闭各需多少秒，并在移动中插值当前位置
+
+    预测以最近一次读数为锚点，按学到的速度外推到目标位置为止；
+    尚未学到对应方向的行程时间时 predict 返回 None，调用方应退回轮询。
+    """
+
+    def __init__(self, open_time=None, close_time=None):
+        self.open_time = open_time
+        self.close_time = close_time
+        self._motion = None
+        self._anchor = None
+
+    def travel_time(self, opening):
+        return self.open_time if opening else self.close_time
+
+    def start(self, level, target, now=None):
+        now = time.monotonic() if now is None else now
+        self._motion = (level, target, now)
+        self._anchor = (level, now)
+
+    def stop(self):
+        self._motion = None
+        self._anchor = None
+
+    def observe(self, level, now=None):
+        """记录移动中的一次真实读数，更新行程时间并作为后续预测的锚点"""
+        if self._motion is None:
+            return
+        now = time.monotonic() if now is None else now
+        start_level, target, started_at = self._motion
+        opening = target > start_level
+        elapsed = now - started_at
+        learned = self.travel_time(opening)
+        estimate = None
+        if level != target and abs(level - start_level) >= MIN_LEARN_DISTANCE:
+            estimate = elapsed * FULL_TRAVEL / abs(level - start_level)
+        elif level == target and abs(target - start_level) >= MIN_LEARN_DISTANCE and learned is not None:
+            # 已到达只说明实际行程不超过此值，只在学习值偏慢时向下修正
+            upper = elapsed * FULL_TRAVEL / abs(target - start_level)
+            if learned > upper:
+                estimate = upper
+        if estimate is not None and elapsed > 0:
+            value = estimate if learned is None else learned + LEARN_ALPHA * (estimate - learned)
+            if opening:
+                self.open_time = value
+            else:
+                self.close_time = value
+        self._anchor = (level, now)
+
+    def predict(self, now=None):
+        """插值当前位置"""
+        if self._motion is None:
+            return None
+        now = time.monotonic() if now is None else now
+        start_level, target, _ = self._motion
+        travel_time = self.travel_time(target > start_level)
+        if not travel_time:
+            return None
+        level, at = self._anchor
+        step = (now - at) * FULL_TRAVEL / travel_time
+        if target > level:
+            return int(min(level + step, target))
+        return int(max(level - step, target))
+
+    def eta(self):
+        """预计到达目标位置的时间（time.monotonic），无法预测时返回 None"""
+        if self._motion is None:
+            return None
+        start_level, target, _ = self._motion
+        travel_time = self.travel_time(target > start_level)
+        if not travel_time:
+            return None
+        level, at = self._anchor
+        return at + abs(target - level) * travel_time / FULL_TRAVEL
@@ -0,0 +1,15 @@
+import json
+
+try:
+    # Home Assistant 自带 orjson；单独使用 core 时没有安装则退回标准库
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def loads(data):
+    """解析完整的响应体，优先使用 orjson"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
@@ -0,0 +1,50 @@
+import time
+from collections import deque
+
+# 日志最多保留的变化条数，超出后丢弃最旧的记录
+DEFAULT_JOURNAL_SIZE = 500
+
+
+class StateJournal:
+    """设备状态变化日志：环形缓冲 (时间戳, 设备 key, 变化的字段)，内存占用有上限
+
+    只记录已有设备的变化，首次出现的设备不记录；listener 在每条新记录写入后调用（用于发布 HA 事件）。
+    """
+
+    def __init__(self, size=DEFAULT_JOURNAL_SIZE):
+        self.entries = deque(maxlen=size)
+        self.total = 0
+        self._listeners = []
+
+    def add_listener(self, listener):
+        """注册新记录回调 listener(timestamp, key, changes)，返回取消注册函数"""
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    def record(self, key, changes):
+        """记录一次变化，changes 为 {字段: (旧值, 新值)}"""
+        timestamp = time.time()
+        self.entries.append((timestamp, key, changes))
+        self.total += 1
+        for listener in self._listeners:
+            listener(timestamp, key, changes)
+
+    def as_list(self, limit=None):
+        """按时间从新到旧返回日志，供诊断使用"""
+        entries = list(self.entries)[-limit:] if limit else list(self.entries)
+        return [
+            {
+                "time": timestamp,
+                "key": list(key),
+                "changes": {field: list(change) for field, change in changes.items()},
+            }
+            for timestamp, key, changes in reversed(entries)
+        ]
+
+    def get_stats(self):
+        return {
+            "size": self.entries.maxlen,
+            "entries": len(self.entries),
+            # 启动以来记录的变化总数，超出 size 的部分已被丢弃
+            "total": self.total,
+        }
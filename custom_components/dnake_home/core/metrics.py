@@ -0,0 +1,105 @@
+# 延迟直方图的桶上限（秒）
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# 近期延迟（指数加权移动平均）中新样本的权重，约反映最近 20 个请求
+EWMA_ALPHA = 0.1
+
+
+class LatencyHistogram:
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = None
+        self.ewma = None
+
+    def observe(self, value):
+        index = 0
+        for bound in self.buckets:
+            if value <= bound:
+                break
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.last = value
+        self.ewma = value if self.ewma is None else self.ewma + EWMA_ALPHA * (value - self.ewma)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def percentile(self, q):
+        """按桶上限估算分位数，落在最后一个桶时返回最大值"""
+        if not self.count:
+            return None
+        target = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return bound
+        return self.max
+
+    def as_dict(self):
+        labels = [f"le_{bound}" for bound in self.buckets] + ["le_inf"]
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "ewma": self.ewma,
+            "last": self.last,
+            "max": self.max,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class ActionMetrics:
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.latency = LatencyHistogram()
+
+    def as_dict(self):
+        return {"requests": self.requests, "errors": self.errors, "latency": self.latency.as_dict()}
+
+
+class GatewayMetrics:
+    """网关性能指标：各 action 的请求数、错误数与延迟分布，以及全量刷新耗时"""
+
+    def __init__(self):
+        self.actions = {}
+        self.refresh_duration = LatencyHistogram()
+        self.last_updated_entities = 0
+        self.total_updated_entities = 0
+
+    def get_action(self, action):
+        metrics = self.actions.get(action)
+        if metrics is None:
+            metrics = self.actions[action] = ActionMetrics()
+        return metrics
+
+    def record_request(self, action, duration, is_success):
+        metrics = self.get_action(action)
+        metrics.requests += 1
+        if not is_success:
+            metrics.errors += 1
+        metrics.latency.observe(duration)
+
+    def record_refresh(self, duration, updated_entities):
+        self.refresh_duration.observe(duration)
+        self.last_updated_entities = updated_entities
+        self.total_updated_entities += updated_entities
+
+    def as_dict(self):
+        return {
+            "actions": {action: metrics.as_dict() for action, metrics in self.actions.items()},
+            "refresh_duration": self.refresh_duration.as_dict(),
+            "last_updated_entities": self.last_updated_entities,
+            "total_updated_entities": self.total_updated_entities,
+        }
@@ -0,0 +1,92 @@
+import asyncio
+import cProfile
+import time
+from contextlib import contextmanager, nullcontext
+
+_NOT_PROFILING = nullcontext()
+
+
+def profile_phase(profiler, phase):
+    """profiler 为 None（默认，未在采样）时返回空上下文，热路径上只多一次判断"""
+    if profiler is None:
+        return _NOT_PROFILING
+    return profiler.measure(phase)
+
+
+class ProfileSession:
+    """一次按需采样：统计接下来 cycles 次全量刷新与 commands 次控制指令中各阶段的耗时
+
+    同步阶段（decode、dispatch、write_state）记录 CPU 时间与耗时；request、command 含网络等待，只记录耗时。
+    dispatch 包含其中各实体的 write_state。采样期间同时运行 cProfile，结束后可导出完整的 profile 文件。
+    """
+
+    def __init__(self, cycles, commands):
+        self.cycles = cycles
+        self.commands = commands
+        self.cycle_count = 0
+        self.command_count = 0
+        self.phases = {}
+        self.finished = asyncio.Event()
+        self._profile = cProfile.Profile()
+        self._started_at = None
+        self._elapsed = 0.0
+
+    def start(self):
+        # 同一线程同时只能有一个 profiler，已被占用时抛出 ValueError
+        self._profile.enable()
+        self._started_at = time.perf_counter()
+        self._check_finished()
+
+    def stop(self):
+        self._profile.disable()
+        self._elapsed = time.perf_counter() - self._started_at
+
+    def dump(self, path):
+        """写出 cProfile 结果（文件 IO，应在 executor 中调用）"""
+        self._profile.dump_stats(path)
+
+    @contextmanager
+    def measure(self, phase):
+        start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - start, time.thread_time() - cpu_start)
+
+    def record(self, phase, wall, cpu=None):
+        stats = self.phases.get(phase)
+        if stats is None:
+            stats = self.phases[phase] = {"count": 0, "wall": 0.0, "cpu": None if cpu is None else 0.0}
+        stats["count"] += 1
+        stats["wall"] += wall
+        if cpu is not None:
+            stats["cpu"] += cpu
+
+    def note_cycle(self):
+        self.cycle_count += 1
+        self._check_finished()
+
+    def note_command(self):
+        self.command_count += 1
+        self._check_finished()
+
+    def _check_finished(self):
+        if self.cycle_count >= self.cycles and self.command_count >= self.commands:
+            self.finished.set()
+
+    def summary(self):
+        return {
+            "elapsed": round(self._elapsed, 3),
+            "cycles": self.cycle_count,
+            "commands": self.command_count,
+            "phases": {
+                phase: {
+                    "count": stats["count"],
+                    "wall_total_ms": round(stats["wall"] * 1e3, 3),
+                    "wall_avg_ms": round(stats["wall"] / stats["count"] * 1e3, 3),
+                    "cpu_total_ms": None if stats["cpu"] is None else round(stats["cpu"] * 1e3, 3),
+                }
+                for phase, stats in self.phases.items()
+            },
+        }
@@ -0,0 +1,46 @@
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class DeviceType:
+
+    def __init__(self, dev_type, platform, entity_class, fields):
+        self.dev_type = dev_type
+        self.platform = platform
+        self.entity_class = entity_class
+        # 该类型设备状态中与实体相关的字段，状态表按这些字段建列，变化检测只看这些字段
+        self.fields = tuple(fields)
+
+
+class DeviceTypeRegistry:
+    """devType -> 实体类与状态字段的注册表，新设备类型只需在平台模块中注册即可接入"""
+
+    def __init__(self):
+        self.types = {}
+
+    def register(self, dev_type, platform, fields):
+        """实体类装饰器：把该类注册为指定 devType 的实体"""
+
+        def _decorator(entity_class):
+            self.types[dev_type] = DeviceType(dev_type, platform, entity_class, fields)
+            return entity_class
+
+        return _decorator
+
+    def get(self, dev_type):
+        return self.types.get(dev_type)
+
+    def create_entities(self, assistant, device_list):
+        """单次遍历设备列表，按平台分组创建实体"""
+        entities = {device_type.platform: [] for device_type in self.types.values()}
+        for device in device_list:
+            device_type = self.types.get(device.get("ty"))
+            if device_type:
+                entities[device_type.platform].append(device_type.entity_class(assistant, device))
+        for platform, platform_entities in entities.items():
+            _LOGGER.info(f"find {platform} num: {len(platform_entities)}")
+        return entities
+
+
+DEVICE_TYPES = DeviceTypeRegistry()
@@ -0,0 +1,80 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+
+_LOGGER = logging.getLogger(__name__)
+
+# 网关同时处理的请求数上限，网关 CGI 在突发请求下性能下降明显
+DEFAULT_MAX_CONCURRENCY = 2
+
+
+class CommandScheduler:
+    """网关请求调度：同一设备的控制指令按顺序执行，不同设备并行，总在途请求数受限"""
+
+    def __init__(self, max_concurrency=DEFAULT_MAX_CONCURRENCY):
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._device_locks = {}
+        self._device_depths = {}
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.in_flight = 0
+        self.wait_count = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.last_wait = 0.0
+
+    @asynccontextmanager
+    async def device_slot(self, dev_key):
+        """同一设备的指令排队执行，asyncio.Lock 按到达顺序唤醒"""
+        lock = self._device_locks.get(dev_key)
+        if lock is None:
+            lock = self._device_locks[dev_key] = asyncio.Lock()
+        self._device_depths[dev_key] = self._device_depths.get(dev_key, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            depth = self._device_depths[dev_key] - 1
+            if depth:
+                self._device_depths[dev_key] = depth
+            else:
+                self._device_depths.pop(dev_key, None)
+                self._device_locks.pop(dev_key, None)
+
+    @asynccontextmanager
+    async def gateway_slot(self):
+        """占用一个网关并发名额，并记录排队深度与等待时间"""
+        start = time.monotonic()
+        self.queue_depth += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queue_depth -= 1
+        wait = time.monotonic() - start
+        self.wait_count += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.last_wait = wait
+        if wait > 1:
+            _LOGGER.debug("gateway request waited %.3fs, queue depth=%s", wait, self.queue_depth)
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def get_stats(self):
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "device_queues": len(self._device_depths),
+            "avg_wait": self.total_wait / self.wait_count if self.wait_count else 0.0,
+            "max_wait": self.max_wait,
+            "last_wait": self.last_wait,
+        }
@@ -0,0 +1,334 @@
+import logging
+from array import array
+from collections import defaultdict
+from itertools import compress, repeat
+from operator import eq, itemgetter, ne
+
+_LOGGER = logging.getLogger(__name__)
+
+# 列中表示字段缺失的值
+_MISSING = float("-inf")
+
+
+def get_state_key(dev_type, dev_no, dev_ch):
+    return dev_type, dev_no, dev_ch
+
+
+def _encode(value):
+    if value is None:
+        return _MISSING
+    if isinstance(value, (int, float)):
+        return value
+    # 网关偶尔返回字符串字段，列中存哈希用于变化检测（原值另存）；
+    # 先转成 float，与列中存储的值比较时不受哈希超出 float 精度的影响
+    return float(hash(value))
+
+
+_key_getter = itemgetter("devType", "devNo", "devCh")
+
+
+def _decode(value):
+    # 网关上报的数值都是整数，列中以 float 保存，还原时转回 int
+    return int(value) if value.is_integer() else value
+
+
+class TypeSnapshot:
+    """单个 devType 的列式快照
+
+    每个设备通道占一行，字段布局由注册表固定，每个字段一列 array('d')。
+    行号与状态 key 在设备首次出现时分配一次，之后每次刷新复用，不再重新拼 key。
+    快照不保留网关返回的原始记录，需要时由列还原，只含注册表声明的字段；
+    非数值的字段值无法由列还原，另存在 _extras 中。
+    """
+
+    def __init__(self, device_type):
+        self.device_type = device_type
+        self.fields = device_type.fields
+        self.keys = []
+        self.columns = [array("d") for _ in self.fields]
+        self._rows = {}
+        self._dirty = set()
+        self._extras = {}
+        self._field_getters = [itemgetter(field) for field in self.fields]
+        # 在部分设备上缺失的字段（如面板新风没有 pm25），按列下标记录
+        self._sparse_fields = set()
+        # 上一轮的记录是否与行号顺序一致
+        self._in_order = False
+
+    def __len__(self):
+        return len(self.keys)
+
+    def find_row(self, dev_no, dev_ch):
+        return self._rows.get(get_state_key(self.device_type.dev_type, dev_no, dev_ch))
+
+    def mark_dirty(self, row):
+        self._dirty.add(row)
+
+    def value(self, row, index):
+        """还原单元格的原值，字段缺失时返回 None"""
+        value = self.columns[index][row]
+        if value == _MISSING:
+            return None
+        if self._extras and (row, index) in self._extras:
+            return self._extras[(row, index)]
+        return _decode(value)
+
+    def record(self, row):
+        """由列还原该行的状态"""
+        dev_type, dev_no, dev_ch = self.keys[row]
+        record = {"devType": dev_type, "devNo": dev_no, "devCh": dev_ch}
+        for index, field in enumerate(self.fields):
+            value = self.value(row, index)
+            if value is not None:
+                record[field] = value
+        return record
+
+    def update(self, records, same_layout=False):
+        """写入本轮该类型的全部记录
+
+        same_layout 表示整个响应的设备顺序与上一轮相同，此时上一轮已对齐的快照不必再逐条比对 key。
+        返回 (changed, received)：changed 为 {发生变化的行: {字段: (旧值, 新值)}}，首次出现的行为 None；
+        received 按行号给出本轮收到的原始记录，本轮没有收到的行为 None。
+        """
+        changed = self._update_in_place(records, same_layout and self._in_order)
+        received = records
+        self._in_order = changed is not None
+        if changed is None:
+            received = [None] * len(self.keys)
+            changed = self._stage(records, received)
+        # 被 invalidate 的行即使相关字段没有变化也要分发
+        for row in self._dirty:
+            changed.setdefault(row, {})
+        self._dirty = set()
+        return changed, received
+
+    def _update_in_place(self, records, aligned):
+        # 设备集合与顺序和上轮一致时（绝大多数刷新），直接与现有列逐列比较（在 C 层迭代），
+        # 只改写变化的单元格，每轮不再构建 key 列表和新的列
+        keys = self.keys
+        if len(records) != len(keys):
+            return None
+        if not aligned:
+            try:
+                if not all(map(eq, keys, map(_key_getter, records))):
+                    return None
+            except KeyError:
+                return None
+        changed = {}
+        for index in range(len(self.fields)):
+            try:
+                self._diff_column(index, records, changed)
+            except KeyError:
+                # 字段在部分设备上缺失，之后该列改用带默认值的读取；重新比较本列，已改写的单元格不会重复计入
+                self._sparse_fields.add(index)
+                self._diff_column(index, records, changed)
+        return changed
+
+    def _diff_column(self, index, records, changed):
+        column = self.columns[index]
+        field = self.fields[index]
+        if index in self._sparse_fields:
+            values = map(dict.get, records, repeat(field), repeat(_MISSING))
+        else:
+            values = map(self._field_getters[index], records)
+        # 非数值字段同样会被标记，按编码后的值复核
+        for row in compress(range(len(column)), map(ne, column, values)):
+            self._set_cell(row, index, records[row].get(field), changed)
+
+    def _stage(self, records, received):
+        # 有新设备或设备顺序变化时逐条定位行号
+        changed = {}
+        for state in records:
+            key = get_state_key(self.device_type.dev_type, state.get("devNo"), state.get("devCh"))
+            row = self._rows.get(key)
+            if row is None:
+                row = self._rows[key] = len(self.keys)
+                self.keys.append(key)
+                for column in self.columns:
+                    column.append(_MISSING)
+                received.append(None)
+                # 首次出现的设备必定分发
+                changed[row] = None
+            received[row] = state
+            for index, field in enumerate(self.fields):
+                self._set_cell(row, index, state.get(field), changed)
+        return changed
+
+    def set_row(self, row, state):
+        """合并单个通道的最新字段（如 readDev 结果），返回变化的字段 {字段: (旧值, 新值)}"""
+        changed = {}
+        for index, field in enumerate(self.fields):
+            if field in state:
+                self._set_cell(row, index, state[field], changed)
+        return changed.get(row, {})
+
+    def _set_cell(self, row, index, value, changed):
+        column = self.columns[index]
+        encoded = _encode(value)
+        if column[row] == encoded:
+            return
+        changes = changed.setdefault(row, {})
+        if changes is not None:
+            changes[self.fields[index]] = (self.value(row, index), value)
+        column[row] = encoded
+        if value is None or isinstance(value, (int, float)):
+            self._extras.pop((row, index), None)
+        else:
+            self._extras[(row, index)] = value
+
+
+class DeviceStateStore:
+    """按 (devType, devNo, devCh) 索引的设备状态表，每次 readAllDevState 只遍历一次
+
+    已注册的设备类型各自保存一份列式快照，变化检测只比较注册表声明的相关字段；
+    未注册类型的记录直接丢弃。已有设备的相关字段变化会写入 journal（若提供）。
+    """
+
+    def __init__(self, registry, journal=None):
+        self.registry = registry
+        self.journal = journal
+        self.snapshots = {}
+        self._listeners = {}
+        # 上一轮响应的布局：(全部记录的 key, {devType: 按位置取出该类型记录的 getter})
+        self._layout = None
+        # 最近一次 update 实际通知到的实体数
+        self.last_dispatch_count = 0
+
+    @property
+    def states(self):
+        """当前所有设备的最新状态，按需由列还原，供快照保存与诊断使用"""
+        return {
+            key: snapshot.record(row)
+            for snapshot in self.snapshots.values()
+            for row, key in enumerate(snapshot.keys)
+        }
+
+    def subscribe(self, key, callback):
+        """订阅单个设备的状态，返回取消订阅函数"""
+        listeners = self._listeners.setdefault(key, [])
+        listeners.append(callback)
+
+        def _unsubscribe():
+            listeners.remove(callback)
+            if not listeners:
+                self._listeners.pop(key, None)
+
+        return _unsubscribe
+
+    def get(self, key):
+        snapshot = self.snapshots.get(key[0])
+        if snapshot is None:
+            return None
+        row = snapshot.find_row(key[1], key[2])
+        return snapshot.record(row) if row is not None else None
+
+    def get_channel(self, dev_no, dev_ch):
+        """按 (devNo, devCh) 查找状态，readDev 的调用方不知道 devType"""
+        for snapshot in self.snapshots.values():
+            row = snapshot.find_row(dev_no, dev_ch)
+            if row is not None:
+                return snapshot.record(row)
+        return None
+
+    def invalidate(self, dev_no, dev_ch):
+        """丢弃某个通道的上次比对结果，下一次全量刷新必定会分发给订阅者"""
+        for snapshot in self.snapshots.values():
+            row = snapshot.find_row(dev_no, dev_ch)
+            if row is not None:
+                snapshot.mark_dirty(row)
+
+    def update_channel(self, dev_no, dev_ch, state):
+        """写入单个通道的 readDev 结果，相关字段变化时分发给订阅者，返回是否变化"""
+        for snapshot in self.snapshots.values():
+            row = snapshot.find_row(dev_no, dev_ch)
+            if row is not None:
+                break
+        else:
+            return False
+        changes = snapshot.set_row(row, state)
+        if not changes:
+            return False
+        if self.journal is not None:
+            self.journal.record(snapshot.keys[row], changes)
+        self._dispatch(snapshot.keys[row], snapshot.record(row))
+        return True
+
+    def _dispatch(self, key, state):
+        callbacks = self._listeners.get(key)
+        if not callbacks:
+            return 0
+        for callback in callbacks:
+            callback(state)
+        return len(callbacks)
+
+    def update(self, states):
+        """写入一次全量状态，只把发生变化的记录分发给对应设备的订阅者
+
+        返回 {key: {字段: (旧值, 新值)}} 形式的变化集合，首次出现的设备为 None，
+        被 invalidate 而相关字段未变的设备为空字典
+        """
+        groups, same_layout = self._group(states or [])
+        changed = {}
+        dispatch_count = 0
+        for dev_type, records in groups.items():
+            snapshot = self.snapshots.get(dev_type)
+            if snapshot is None:
+                device_type = self.registry.get(dev_type)
+                if device_type is None:
+                    # 未注册的设备类型没有对应实体
+                    continue
+                snapshot = self.snapshots[dev_type] = TypeSnapshot(device_type)
+            changed_rows, received = snapshot.update(records, same_layout)
+            for row in sorted(changed_rows):
+                key = snapshot.keys[row]
+                changes = changed[key] = changed_rows[row]
+                if self.journal is not None and changes:
+                    self.journal.record(key, changes)
+                # 分发本轮收到的原始记录，本轮没有收到的设备由列还原
+                state = received[row]
+                dispatch_count += self._dispatch(key, state if state is not None else snapshot.record(row))
+        if not same_layout:
+            self._remember_layout(states or [])
+        self.last_dispatch_count = dispatch_count
+        return changed
+
+    def _group(self, states):
+        # 按 devType 分组。响应的设备顺序与上一轮相同时（绝大多数刷新），
+        # 按上一轮记下的位置在 C 层取出各类型的记录，不再逐条分组
+        layout = self._layout
+        if layout is not None and len(states) == len(layout[0]):
+            try:
+                if all(map(eq, layout[0], map(_key_getter, states))):
+                    return {dev_type: getter(states) for dev_type, getter in layout[1].items()}, True
+            except KeyError:
+                pass
+        groups = defaultdict(list)
+        for state in states:
+            groups[state.get("devType")].append(state)
+        return groups, False
+
+    def _remember_layout(self, states):
+        # 记下本轮响应的布局，key 复用快照中已有的元组，不额外占用内存
+        keys = []
+        positions = defaultdict(list)
+        try:
+            for position, key in enumerate(map(_key_getter, states)):
+                snapshot = self.snapshots.get(key[0])
+                if snapshot is not None:
+                    key = snapshot.keys[snapshot._rows[key]]
+                    positions[key[0]].append(position)
+                keys.append(key)
+        except KeyError:
+            self._layout = None
+            return
+        self._layout = (
+            keys,
+            {dev_type: _positions_getter(type_positions) for dev_type, type_positions in positions.items()},
+        )
+
+
+def _positions_getter(positions):
+    if len(positions) == 1:
+        position = positions[0]
+        return lambda states: (states[position],)
+    return itemgetter(*positions)
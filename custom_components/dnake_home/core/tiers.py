@@ -0,0 +1,119 @@
+import time
+
+# 热通道 readDev 的默认预算（每秒请求数）
+DEFAULT_HOT_BUDGET = 4.0
+# 冷通道全量刷新 readAllDevState 的默认预算（每秒请求数）
+DEFAULT_COLD_BUDGET = 1.0
+# 通道检测到变化后保持为热通道的时间（秒）
+HOT_TTL = 30
+# 通道被控制后保持为热通道的时间（秒）：指令结果主要由实体的确认读取跟踪，只需略长于确认超时
+COMMAND_HOT_TTL = 5
+
+
+class TokenBucket:
+    """令牌桶：rate 为每秒补充的令牌数，即请求预算；burst 为最多累积的令牌数"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+
+    @property
+    def tokens(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        return self._tokens
+
+    def try_acquire(self, count=1):
+        if self.tokens >= count:
+            self._tokens -= count
+            return True
+        return False
+
+    def take(self, count):
+        """尽量取出 count 个令牌，返回实际取到的数量"""
+        granted = min(count, int(self.tokens))
+        self._tokens -= granted
+        return granted
+
+
+class PollTiers:
+    """轮询分层：热通道单独用 readDev 快速轮询，其余冷通道由全量刷新覆盖
+
+    最近发生变化的通道在 HOT_TTL 内为热通道，最近被控制的通道在 COMMAND_HOT_TTL 内为热通道；
+    移动中的窗帘由 CoverMotionTracker 固定为热通道（pin），并由它自己轮询。两层各有独立的每秒请求预算。
+    """
+
+    def __init__(self, hot_budget=DEFAULT_HOT_BUDGET, cold_budget=DEFAULT_COLD_BUDGET, hot_ttl=HOT_TTL,
+                 command_ttl=COMMAND_HOT_TTL):
+        self.hot_budget = TokenBucket(hot_budget)
+        self.cold_budget = TokenBucket(cold_budget, burst=max(2.0, cold_budget))
+        self.hot_ttl = hot_ttl
+        self.command_ttl = command_ttl
+        self._hot = {}
+        # 被控制的通道及其控制窗口的结束时间
+        self._commanded = {}
+        self._pinned = {}
+        self._listeners = []
+
+    def add_listener(self, listener):
+        """注册非固定通道转为热通道时的回调（用于启动热通道轮询），返回取消注册函数
+
+        每次 mark_hot 都会调用，轮询已在运行时由回调方忽略：热通道轮询停止时 _hot 中可能仍有
+        固定或未清理的过期通道，不能以 _hot 是否为空判断是否需要重新启动
+        """
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    def mark_hot(self, dev_no, dev_ch, ttl=None):
+        self._hot[(dev_no, dev_ch)] = time.monotonic() + (self.hot_ttl if ttl is None else ttl)
+        if (dev_no, dev_ch) not in self._pinned:
+            for listener in list(self._listeners):
+                listener()
+
+    def mark_commanded(self, dev_no, dev_ch):
+        """被控制的通道在 command_ttl 内为热通道"""
+        self._commanded[(dev_no, dev_ch)] = time.monotonic() + self.command_ttl
+        self.mark_hot(dev_no, dev_ch, self.command_ttl)
+
+    def mark_changed(self, dev_no, dev_ch):
+        """检测到变化的通道转为热通道；控制窗口内的变化多由指令本身造成，不延长热通道时间"""
+        commanded_until = self._commanded.get((dev_no, dev_ch))
+        if commanded_until is not None:
+            if commanded_until > time.monotonic():
+                return
+            del self._commanded[(dev_no, dev_ch)]
+        self.mark_hot(dev_no, dev_ch)
+
+    def pin(self, dev_no, dev_ch):
+        self._pinned[(dev_no, dev_ch)] = self._pinned.get((dev_no, dev_ch), 0) + 1
+
+    def unpin(self, dev_no, dev_ch):
+        count = self._pinned.pop((dev_no, dev_ch), 0) - 1
+        if count > 0:
+            self._pinned[(dev_no, dev_ch)] = count
+        else:
+            # 刚停下的窗帘在 HOT_TTL 内继续作为热通道
+            self.mark_hot(dev_no, dev_ch)
+
+    def hot_channels(self):
+        """当前需要热轮询的通道（不含固定的通道），同时清理过期的热通道"""
+        now = time.monotonic()
+        expired = [key for key, expires_at in self._hot.items() if expires_at <= now]
+        for key in expired:
+            del self._hot[key]
+            self._commanded.pop(key, None)
+        return [key for key in self._hot if key not in self._pinned]
+
+    def get_stats(self):
+        return {
+            "hot_channels": len(self._hot),
+            "commanded_channels": len(self._commanded),
+            "pinned_channels": len(self._pinned),
+            "hot_budget": self.hot_budget.rate,
+            "hot_tokens": round(self.hot_budget.tokens, 2),
+            "cold_budget": self.cold_budget.rate,
+            "cold_tokens": round(self.cold_budget.tokens, 2),
+        }
@@ -1,34 +1,33 @@
 import asyncio
 import logging
+import time
 from datetime import timedelta
 
 from homeassistant.components.cover import CoverEntity, CoverEntityFeature
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.const import Platform
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.restore_state import RestoreEntity
 
-from .core.assistant import assistant
-from .core.constant import DOMAIN, MANUFACTURER
+from .core.assistant import Assistant
+from .core.constant import DOMAIN, MANUFACTURER, STATE_FIELDS, DevType
+from .core.cover_model import CoverTravelModel
+from .core.registry import DEVICE_TYPES
+from .entity import DnakeEntity
 
 _LOGGER = logging.getLogger(__name__)
 
-
-def load_covers(device_list):
-    covers = [DnakeCover(device) for device in device_list if device.get("ty") == 514]
-    _LOGGER.info(f"find cover num: {len(covers)}")
-    assistant.entries["cover"] = covers
-
-
-def update_covers_state(states):
-    covers = assistant.entries["cover"]
-    for cover in covers:
-        if cover.is_opening or cover.is_closing:
-            return
-        state = next((state for state in states if state.get('devType') == 514 and cover.is_hint_state(state)), None)
-        if state:
-            cover.update_state(state)
+# 移动中窗帘的轮询间隔
+_MOTION_POLL_INTERVAL = timedelta(milliseconds=500)
+# 同时移动的窗帘达到该数量时，改用一次 readAllDevState 代替多次 readDev
+_MOTION_BULK_READ_THRESHOLD = 3
+# 位置连续多少次轮询不变即认为窗帘已停止
+_MOTION_SETTLE_POLLS = 6
+# 已学到行程时间的窗帘在预计到达前多少秒开始读取确认
+_MOTION_CONFIRM_LEAD = 1.0
 
 
 async def async_setup_entry(
@@ -36,45 +35,168 @@ async def async_setup_entry(
         entry: ConfigEntry,
         async_add_entities: AddEntitiesCallback,
 ):
-    cover_list = assistant.entries["cover"]
+    assistant = hass.data[DOMAIN][entry.entry_id]["assistant"]
+    cover_list = assistant.entries.get(Platform.COVER, [])
     if cover_list:
+        motion_tracker = CoverMotionTracker(hass, assistant)
+        entry.async_on_unload(motion_tracker.async_shutdown)
+        for cover in cover_list:
+            cover.bind_motion_tracker(motion_tracker)
         async_add_entities(cover_list)
 
 
-class DnakeCover(CoverEntity):
+class CoverMotionTracker:
+    """所有移动中的窗帘共用一个轮询周期，窗帘全部停止后自动结束
+
+    已学到行程时间的窗帘在本地插值位置，只在预计到达前后读取确认；其余窗帘每个周期读取一次
+    """
+
+    def __init__(self, hass: HomeAssistant, assistant: Assistant):
+        self._hass = hass
+        self._assistant = assistant
+        self._moving = {}
+        self._polling = False
+        self._cancel = None
+
+    @callback
+    def track(self, cover):
+        if cover not in self._moving:
+            # 移动中的窗帘固定为热通道，由本类轮询
+            self._assistant.tiers.pin(cover.dev_no, cover.dev_ch)
+        # [位置连续不变的读取次数, 上次读到的位置]
+        self._moving[cover] = [0, cover.current_level]
+        if self._cancel is None:
+            self._cancel = async_track_time_interval(
+                self._hass, self._async_poll, _MOTION_POLL_INTERVAL
+            )
+
+    @callback
+    def untrack(self, cover):
+        if self._moving.pop(cover, None) is not None:
+            self._assistant.tiers.unpin(cover.dev_no, cover.dev_ch)
+            cover.end_motion()
+        if not self._moving:
+            self.async_shutdown()
+
+    @callback
+    def async_shutdown(self):
+        if self._cancel:
+            self._cancel()
+            self._cancel = None
+
+    async def _async_poll(self, now=None):
+        # 上一轮请求未返回时跳过本轮，避免请求堆积
+        if self._polling or not self._moving:
+            return
+        if not self._assistant.available:
+            # 网关熔断期间不轮询，恢复后继续
+            return
+        now = time.monotonic()
+        covers = [cover for cover in self._moving if not cover.async_predict_level(now) or cover.confirm_due(now)]
+        if not covers:
+            return
+        tiers = self._assistant.tiers
+        # 移动的窗帘较多或热通道预算不足时，用一次全量读取（消耗冷通道预算）覆盖所有窗帘
+        use_bulk_read = len(covers) >= _MOTION_BULK_READ_THRESHOLD or not tiers.hot_budget.try_acquire(len(covers))
+        if use_bulk_read and not tiers.cold_budget.try_acquire():
+            return
+        self._polling = True
+        try:
+            if use_bulk_read:
+                # 一次全量读取同时覆盖所有移动中的窗帘，并顺带刷新其他设备
+                dev_list = await self._assistant.read_all_dev_state()
+                if dev_list is None:
+                    return
+                self._assistant.states.update(dev_list)
+                states = [self._assistant.states.get(cover.state_key) for cover in covers]
+            else:
+                states = await asyncio.gather(
+                    *(self._assistant.read_dev_state(cover.dev_no, cover.dev_ch) for cover in covers)
+                )
+        finally:
+            self._polling = False
+        for cover, state in zip(covers, states):
+            if cover not in self._moving or not state or state.get("result", "ok") != "ok":
+                continue
+            motion = self._moving[cover]
+            cover.observe_state(state)
+            if cover.current_level == cover.target_level:
+                self.untrack(cover)
+            elif cover.current_level == motion[1]:
+                motion[0] += 1
+                if motion[0] >= _MOTION_SETTLE_POLLS:
+                    # 位置长时间不变，视为已停止（如遇阻）
+                    self.untrack(cover)
+                    cover.update_state(state)
+            else:
+                motion[0] = 0
+            motion[1] = cover.current_level
+
+
+def _level_settled():
+    last_level = []
+
+    def _settled(state):
+        level = state.get("level")
+        settled = last_level == [level]
+        last_level[:] = [level]
+        return settled
+
+    return _settled
+
+
+@DEVICE_TYPES.register(DevType.Cover.value, Platform.COVER, STATE_FIELDS[DevType.Cover.value])
+class DnakeCover(DnakeEntity, RestoreEntity, CoverEntity):
 
-    def __init__(self, device):
-        self._name = device.get("na")
-        self._dev_no = device.get("nm")
-        self._dev_ch = device.get("ch")
+    def __init__(self, assistant: Assistant, device):
+        super().__init__(assistant, device)
         self._current_level = device.get("level", 0)
         self._target_level = self._current_level
-        self._level_refresher_cancel = None
+        self._motion_tracker = None
+        self._travel_model = CoverTravelModel()
 
-    def is_hint_state(self, state):
-        return state.get("devNo") == self._dev_no and state.get("devCh") == self._dev_ch
+    def bind_motion_tracker(self, motion_tracker: CoverMotionTracker):
+        self._motion_tracker = motion_tracker
+
+    @property
+    def dev_no(self):
+        return self._dev_no
+
+    @property
+    def dev_ch(self):
+        return self._dev_ch
+
+    @property
+    def current_level(self):
+        return self._current_level
+
+    @property
+    def target_level(self):
+        return self._target_level
 
     @property
     def unique_id(self):
-        return f"dnake_cover_{self._dev_no}_{self._dev_ch}"
+        return f"{self._assistant.uid}_dnake_cover_{self._dev_no}_{self._dev_ch}"
 
     @property
     def device_info(self):
         return DeviceInfo(
-            identifiers={(DOMAIN, f"cover_{self._dev_no}_{self._dev_ch}")},
+            identifiers={self._assistant.get_identifier(f"cover_{self._dev_no}_{self._dev_ch}")},
             name=self._name,
             manufacturer=MANUFACTURER,
             model="窗帘控制",
-            via_device=(DOMAIN, "gateway"),
+            via_device=self._assistant.gateway_identifier,
         )
 
     @property
-    def should_poll(self):
-        return False
-
-    @property
-    def name(self):
-        return self._name
+    def extra_state_attributes(self):
+        # 学到的全程打开、关闭时间（秒），重启后恢复
+        attributes = {}
+        if self._travel_model.open_time:
+            attributes["open_travel_time"] = round(self._travel_model.open_time, 2)
+        if self._travel_model.close_time:
+            attributes["close_travel_time"] = round(self._travel_model.close_time, 2)
+        return attributes
 
     @property
     def is_closed(self):
@@ -110,54 +232,78 @@ class DnakeCover(CoverEntity):
 
     async def async_set_cover_position(self, **kwargs):
         target_level = int((kwargs.get("position", 0) / 100) * 254)
-        is_success = await self.hass.async_add_executor_job(
-            assistant.set_level,
+        is_success = await self._assistant.set_level(
             self._dev_no,
             self._dev_ch,
             target_level,
         )
         if is_success:
             self._target_level = target_level
-            self._start_schedule_update()
+            self._travel_model.start(self._current_level, target_level)
+            self._motion_tracker.track(self)
         else:
             _LOGGER.error("set cover position fail")
 
     async def async_stop_cover(self, **kwargs):
-        is_success = await self.hass.async_add_executor_job(
-            assistant.stop,
+        is_success = await self._assistant.stop(
             self._dev_no,
             self._dev_ch,
         )
         if is_success:
-            self._stop_schedule_update()
-            await asyncio.sleep(1)
-            await self._async_refresh_level()
-
-    def _start_schedule_update(self):
-        self._stop_schedule_update()
-        self._level_refresher_cancel = async_track_time_interval(
-            self.hass,
-            self._do_schedule_update,
-            timedelta(milliseconds=500),
-        )
+            self._motion_tracker.untrack(self)
+            # 位置连续两次读取不变即已停下，不再固定等待 1 秒
+            _, state = await self._assistant.wait_for_state(self._dev_no, self._dev_ch, _level_settled())
+            if state:
+                self.update_state(state)
+            else:
+                # 读取失败（如网关熔断）时也要清除移动目标，否则 is_opening/is_closing 一直为真，
+                # handle_state 会丢弃之后的所有更新；停下的通道仍是热通道，真实位置由后续轮询更新
+                self._target_level = self._current_level
+                self.async_write_ha_state()
 
-    async def _do_schedule_update(self, now=None):
-        await self._async_refresh_level(update_target_level=False)
-        if self._current_level == self._target_level:
-            self._stop_schedule_update()
+    async def async_added_to_hass(self):
+        await super().async_added_to_hass()
+        last_state = await self.async_get_last_state()
+        if last_state:
+            self._travel_model.open_time = last_state.attributes.get("open_travel_time")
+            self._travel_model.close_time = last_state.attributes.get("close_travel_time")
 
-    def _stop_schedule_update(self):
-        if self._level_refresher_cancel:
-            self._level_refresher_cancel()
+    async def async_will_remove_from_hass(self):
+        await super().async_will_remove_from_hass()
+        self._motion_tracker.untrack(self)
 
-    async def _async_refresh_level(self, update_target_level=True):
-        state = await self.hass.async_add_executor_job(
-            assistant.read_dev_state,
-            self._dev_no,
-            self._dev_ch,
-        )
-        if state and state.get("result") == "ok":
-            self.update_state(state, update_target_level=update_target_level)
+    @callback
+    def async_predict_level(self, now):
+        """按学到的行程时间插值位置并更新界面，无法预测时返回 False"""
+        level = self._travel_model.predict(now)
+        if level is None:
+            return False
+        # 确认到达之前停在目标前一格，保持 opening/closing 状态
+        if self._target_level > self._current_level:
+            level = min(level, self._target_level - 1)
+        elif self._target_level < self._current_level:
+            level = max(level, self._target_level + 1)
+        if level != self._current_level:
+            self._current_level = level
+            self.async_write_ha_state()
+        return True
+
+    def confirm_due(self, now):
+        eta = self._travel_model.eta()
+        return eta is None or now >= eta - _MOTION_CONFIRM_LEAD
+
+    def observe_state(self, state):
+        self._travel_model.observe(state.get("level", 0))
+        self.update_state(state, update_target_level=False)
+
+    def end_motion(self):
+        self._travel_model.stop()
+
+    def handle_state(self, state):
+        # 窗帘移动过程中由 CoverMotionTracker 负责更新位置
+        if self.is_opening or self.is_closing:
+            return
+        self.update_state(state)
 
     def update_state(self, state, update_target_level=True):
         current_level = state.get("level", 0)
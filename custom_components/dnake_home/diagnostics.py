@@ -0,0 +1,30 @@
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .core.constant import DOMAIN
+
+TO_REDACT = {"auth_username", "auth_password"}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry):
+    assistant = hass.data[DOMAIN][entry.entry_id]["assistant"]
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+    return {
+        "entry": async_redact_data(dict(entry.data), TO_REDACT),
+        "gateway": {
+            "available": assistant.available,
+            "breaker_state": assistant.breaker.state,
+            "breaker_failures": assistant.breaker.failures,
+            "refresh_interval": coordinator.current_interval.total_seconds(),
+            "devices": {platform: len(entities) for platform, entities in assistant.entries.items()},
+            "states": len(assistant.states.states),
+        },
+        "scheduler": assistant.scheduler.get_stats(),
+        "tiers": assistant.tiers.get_stats(),
+        "metrics": assistant.metrics.as_dict(),
+        "journal": {
+            **assistant.journal.get_stats(),
+            "changes": assistant.journal.as_list(),
+        },
+    }
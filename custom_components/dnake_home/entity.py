@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import time
+
+from homeassistant.core import callback
+from homeassistant.helpers.entity import Entity
+
+from .core.assistant import Assistant
+from .core.profiler import profile_phase
+from .core.store import get_state_key
+
+_LOGGER = logging.getLogger(__name__)
+
+# 控制指令成功后用 readDev 确认设备状态的轮询间隔与超时（秒）
+CONFIRM_INTERVAL = 0.3
+CONFIRM_TIMEOUT = 3
+
+
+class DnakeEntity(Entity):
+    """狄耐克设备实体基类：订阅状态表中属于自己的那一条记录"""
+
+    def __init__(self, assistant: Assistant, device):
+        self._assistant = assistant
+        self._name = device.get("na")
+        self._dev_no = device.get("nm")
+        self._dev_ch = device.get("ch")
+        self._dev_type = device.get("ty")
+        self._pending_confirms = {}
+        self._confirm_deadline = 0.0
+        self._confirm_task = None
+
+    @property
+    def state_key(self):
+        return get_state_key(self._dev_type, self._dev_no, self._dev_ch)
+
+    @property
+    def should_poll(self):
+        return False
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def available(self):
+        return self._assistant.available
+
+    async def async_added_to_hass(self):
+        self.async_on_remove(
+            self._assistant.states.subscribe(self.state_key, self.handle_state)
+        )
+        # 网关熔断或恢复时刷新可用状态
+        self.async_on_remove(
+            self._assistant.add_availability_listener(self.async_write_ha_state)
+        )
+
+    @callback
+    def async_confirm(self, field, is_confirmed):
+        """乐观更新后确认设备确实执行了指令
+
+        以 CONFIRM_INTERVAL 间隔对该通道发起 readDev，直到所有待确认条件满足；
+        超过 CONFIRM_TIMEOUT 仍未满足则以网关上报的真实状态回滚乐观状态。
+        待确认条件按字段保存，同一字段的新指令（拖动滑块、快速开关等）替换旧条件。
+        """
+        self._pending_confirms[field] = is_confirmed
+        self._confirm_deadline = time.monotonic() + CONFIRM_TIMEOUT
+        if self._confirm_task is None:
+            self._confirm_task = self.hass.async_create_task(self._async_confirm_state())
+
+    async def _async_confirm_state(self):
+        state = None
+        try:
+            while True:
+                await asyncio.sleep(CONFIRM_INTERVAL)
+                read_state = await self._assistant.read_dev_state(self._dev_no, self._dev_ch)
+                if read_state and read_state.get("result") == "ok":
+                    state = read_state
+                    if all(is_confirmed(state) for is_confirmed in self._pending_confirms.values()):
+                        break
+                if time.monotonic() >= self._confirm_deadline:
+                    _LOGGER.warning("device %s did not confirm command, roll back state", self.state_key)
+                    break
+        finally:
+            self._pending_confirms = {}
+            self._confirm_task = None
+        if state is None:
+            state = self._assistant.states.get(self.state_key)
+        if state:
+            self.update_state(state)
+
+    async def async_will_remove_from_hass(self):
+        if self._confirm_task:
+            self._confirm_task.cancel()
+
+    def handle_state(self, state):
+        # 确认过程中由 readDev 结果更新状态，避免全量刷新中的旧状态造成界面来回跳变
+        if self._confirm_task is not None:
+            return
+        self.update_state(state)
+
+    @callback
+    def async_write_ha_state(self):
+        with profile_phase(self._assistant.profiler, "write_state"):
+            super().async_write_ha_state()
+
+    def update_state(self, state):
+        raise NotImplementedError
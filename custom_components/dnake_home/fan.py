@@ -3,13 +3,16 @@ from typing import Any, Optional
 
 from homeassistant.components.fan import FanEntity, FanEntityFeature
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import Platform
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.util.percentage import ranged_value_to_percentage, percentage_to_ranged_value
 
-from .core.assistant import assistant
-from .core.constant import DOMAIN, MANUFACTURER
+from .core.assistant import Assistant
+from .core.constant import DOMAIN, MANUFACTURER, STATE_FIELDS, DevType
+from .core.registry import DEVICE_TYPES
+from .entity import DnakeEntity
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -24,82 +27,51 @@ _air_fresh_fan_table = {
 SPEED_COUNT = len(_air_fresh_fan_table)  # 3 speeds: low, medium, high
 
 
-def load_fans(device_list):
-    """Load fresh air fan devices from the device list."""
-    fans = [
-        DnakeAirFreshFan(device) for device in device_list if device.get("ty") == 16926
-    ]
-    _LOGGER.info(f"Found fresh air fan devices: {len(fans)}")
-    assistant.entries["fan"] = fans
-
-
-def update_fans_state(states):
-    """Update the state of all fan entities based on received state data."""
-    fans = assistant.entries.get("fan", [])
-    for fan in fans:
-        state = next((state for state in states if fan.is_hint_state(state)), None)
-        if state:
-            fan.update_state(state)
-
-
 async def async_setup_entry(
     hass: HomeAssistant,
     entry: ConfigEntry,
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up fan entities from a config entry."""
-    fan_list = assistant.entries.get("fan", [])
+    assistant = hass.data[DOMAIN][entry.entry_id]["assistant"]
+    fan_list = assistant.entries.get(Platform.FAN, [])
     if fan_list:
         async_add_entities(fan_list)
 
 
-class DnakeAirFreshFan(FanEntity):
+@DEVICE_TYPES.register(DevType.AirFresh.value, Platform.FAN, STATE_FIELDS[DevType.AirFresh.value])
+@DEVICE_TYPES.register(DevType.PanelAirFresh.value, Platform.FAN, STATE_FIELDS[DevType.PanelAirFresh.value])
+class DnakeAirFreshFan(DnakeEntity, FanEntity):
     """Representation of a Dnake fresh air fan entity."""
 
     _attr_supported_features = FanEntityFeature.SET_SPEED | FanEntityFeature.TURN_ON | FanEntityFeature.TURN_OFF
     _attr_speed_count = SPEED_COUNT  # 3 speed levels (low, medium, high)
     _enable_turn_on_off_backwards_compatibility = False  # Disable deprecated turn on/off compatibility
 
-    def __init__(self, device):
+    def __init__(self, assistant: Assistant, device):
         """Initialize the fan entity."""
-        self._name = device.get("na")
-        self._dev_no = device.get("nm")
-        self._dev_ch = device.get("ch")
-        self._dev_type = device.get("ty")
+        super().__init__(assistant, device)
         self._is_on = device.get("powerOn", 0) == 1
         self._attr_percentage = self._calculate_percentage(device.get("speed", 0))
         self._error_code = device.get("errorCode", 0)
         self._pm25 = device.get("pm25", 0)
 
-    def is_hint_state(self, state):
-        """Check if the state corresponds to this fan."""
-        return (
-            state.get("devType") == self._dev_type
-            and state.get("devNo") == self._dev_no
-            and state.get("devCh") == self._dev_ch
-        )
-
     @property
     def unique_id(self) -> str:
         """Return a unique ID for the fan."""
-        return f"dnake_air_fresh_fan_{self._dev_no}_{self._dev_ch}"
+        return f"{self._assistant.uid}_dnake_air_fresh_fan_{self._dev_no}_{self._dev_ch}"
 
     @property
     def device_info(self) -> DeviceInfo:
         """Return device information for the fan."""
         return DeviceInfo(
-            identifiers={(DOMAIN, f"air_fresh_fan_{self._dev_no}_{self._dev_ch}")},
+            identifiers={self._assistant.get_identifier(f"air_fresh_fan_{self._dev_no}_{self._dev_ch}")},
             name=self._name,
             manufacturer=MANUFACTURER,
             model="Fresh Air Fan",
-            via_device=(DOMAIN, "gateway"),
+            via_device=self._assistant.gateway_identifier,
         )
 
-    @property
-    def name(self) -> str:
-        """Return the name of the fan."""
-        return self._name
-
     @property
     def is_on(self) -> Optional[bool]:
         """Return true if the fan is on."""
@@ -139,11 +111,10 @@ class DnakeAirFreshFan(FanEntity):
     ) -> None:
         """Turn on the fan."""
         if not self._is_on:
-            is_success = await self.hass.async_add_executor_job(
-                assistant.set_air_fresh_power, self._dev_no, self._dev_ch, True
-            )
+            is_success = await self._assistant.set_air_fresh_power(self._dev_no, self._dev_ch, True)
             if is_success:
                 self._is_on = True
+                self.async_confirm("powerOn", lambda state: state.get("powerOn", 0) == 1)
                 # Default to lowest speed (0 = low) if no percentage is specified
                 if percentage is None:
                     percentage = self._calculate_percentage(0)
@@ -155,24 +126,22 @@ class DnakeAirFreshFan(FanEntity):
 
     async def async_turn_off(self, **kwargs: Any) -> None:
         """Turn off the fan."""
-        is_success = await self.hass.async_add_executor_job(
-            assistant.set_air_fresh_power, self._dev_no, self._dev_ch, False
-        )
+        is_success = await self._assistant.set_air_fresh_power(self._dev_no, self._dev_ch, False)
         if is_success:
             self._is_on = False
             self._attr_percentage = None  # No speed when off
             self.async_write_ha_state()
+            self.async_confirm("powerOn", lambda state: state.get("powerOn", 0) == 0)
 
     async def async_set_percentage(self, percentage: int) -> None:
         """Set the speed of the fan as a percentage."""
         speed_index = self._percentage_to_speed(percentage)
-        is_success = await self.hass.async_add_executor_job(
-            assistant.set_air_fresh_speed, self._dev_no, self._dev_ch, speed_index
-        )
+        is_success = await self._assistant.set_air_fresh_speed(self._dev_no, self._dev_ch, speed_index)
         if is_success:
             self._attr_percentage = self._calculate_percentage(speed_index)
             self._is_on = True  # Ensure fan is marked as on when setting speed
             self.async_write_ha_state()
+            self.async_confirm("speed", lambda state: state.get("speed") == speed_index)
 
     def update_state(self, state: dict) -> None:
         """Update the fan's state based on received data."""
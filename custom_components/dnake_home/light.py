@@ -5,73 +5,51 @@ from homeassistant.components.light import (
     ColorMode,
 )
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import Platform
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from .core.assistant import assistant
-from .core.constant import DOMAIN, MANUFACTURER
+from .core.assistant import Assistant
+from .core.constant import DOMAIN, MANUFACTURER, STATE_FIELDS, DevType
+from .core.registry import DEVICE_TYPES
+from .entity import DnakeEntity
 
 _LOGGER = logging.getLogger(__name__)
 
 
-def load_lights(device_list):
-    lights = [DnakeLight(device) for device in device_list if device.get("ty") == 256]
-    _LOGGER.info(f"find light num: {len(lights)}")
-    assistant.entries["light"] = lights
-
-
-def update_lights_state(states):
-    lights = assistant.entries["light"]
-    for light in lights:
-        state = next((state for state in states if state.get('devType') == 256 and light.is_hint_state(state)), None)
-        if state:
-            light.update_state(state)
-
-
 async def async_setup_entry(
         hass: HomeAssistant,
         entry: ConfigEntry,
         async_add_entities: AddEntitiesCallback,
 ):
-    light_list = assistant.entries["light"]
+    assistant = hass.data[DOMAIN][entry.entry_id]["assistant"]
+    light_list = assistant.entries.get(Platform.LIGHT, [])
     if light_list:
         async_add_entities(light_list)
 
 
-class DnakeLight(LightEntity):
+@DEVICE_TYPES.register(DevType.Light.value, Platform.LIGHT, STATE_FIELDS[DevType.Light.value])
+class DnakeLight(DnakeEntity, LightEntity):
 
-    def __init__(self, device):
-        self._name = device.get("na")
-        self._dev_no = device.get("nm")
-        self._dev_ch = device.get("ch")
+    def __init__(self, assistant: Assistant, device):
+        super().__init__(assistant, device)
         self._is_on = device.get("state", 0) == 1
 
-    def is_hint_state(self, state):
-        return state.get("devNo") == self._dev_no and state.get("devCh") == self._dev_ch
-
     @property
     def unique_id(self):
-        return f"dnake_light_{self._dev_no}_{self._dev_ch}"
+        return f"{self._assistant.uid}_dnake_light_{self._dev_no}_{self._dev_ch}"
 
     @property
     def device_info(self):
         return DeviceInfo(
-            identifiers={(DOMAIN, f"light_{self._dev_no}_{self._dev_ch}")},
+            identifiers={self._assistant.get_identifier(f"light_{self._dev_no}_{self._dev_ch}")},
             name=self._name,
             manufacturer=MANUFACTURER,
             model="灯光控制",
-            via_device=(DOMAIN, "gateway"),
+            via_device=self._assistant.gateway_identifier,
         )
 
-    @property
-    def should_poll(self):
-        return False
-
-    @property
-    def name(self):
-        return self._name
-
     @property
     def is_on(self):
         return self._is_on
@@ -91,8 +69,7 @@ class DnakeLight(LightEntity):
         await self._turn_to(False)
 
     async def _turn_to(self, is_on):
-        is_success = await self.hass.async_add_executor_job(
-            assistant.turn_to,
+        is_success = await self._assistant.turn_to(
             self._dev_no,
             self._dev_ch,
             is_on,
@@ -100,6 +77,7 @@ class DnakeLight(LightEntity):
         if is_success:
             self._is_on = is_on
             self.async_write_ha_state()
+            self.async_confirm("state", lambda state: (state.get("state", 0) == 1) == is_on)
 
     def update_state(self, state):
         self._is_on = state.get("state", 0) == 1
@@ -0,0 +1,148 @@
+import logging
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Callable, Optional
+
+from homeassistant.components.sensor import (
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EntityCategory, UnitOfTime
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from .core.assistant import Assistant
+from .core.constant import Action, DOMAIN
+from .core.metrics import LatencyHistogram
+
+_LOGGER = logging.getLogger(__name__)
+
+# 诊断传感器只读取内存中的指标，定时写入状态即可
+SCAN_INTERVAL = timedelta(seconds=30)
+
+
+def _to_ms(value: Optional[float]) -> Optional[float]:
+    return round(value * 1000, 1) if value is not None else None
+
+
+def _latency_attributes(histogram: LatencyHistogram) -> dict[str, Any]:
+    return {
+        "count": histogram.count,
+        "mean_ms": _to_ms(histogram.mean),
+        "last_ms": _to_ms(histogram.last),
+        "max_ms": _to_ms(histogram.max),
+        "p50_ms": _to_ms(histogram.percentile(0.5)),
+        "p95_ms": _to_ms(histogram.percentile(0.95)),
+        "buckets": histogram.as_dict()["buckets"],
+    }
+
+
+@dataclass(frozen=True, kw_only=True)
+class DnakeGatewaySensorEntityDescription(SensorEntityDescription):
+    """Describes a gateway diagnostic sensor."""
+
+    value_fn: Callable[[Assistant], Any] = None
+    attributes_fn: Optional[Callable[[Assistant], dict[str, Any]]] = None
+
+
+def _action_sensors(action: Action) -> list[DnakeGatewaySensorEntityDescription]:
+    name = action.value
+    return [
+        DnakeGatewaySensorEntityDescription(
+            key=f"{name}_latency",
+            name=f"{name} latency",
+            native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+            state_class=SensorStateClass.MEASUREMENT,
+            # 状态为近期延迟，网关变慢时能很快反映出来；启动以来的统计在属性中
+            value_fn=lambda assistant: _to_ms(assistant.metrics.get_action(name).latency.ewma),
+            attributes_fn=lambda assistant: _latency_attributes(assistant.metrics.get_action(name).latency),
+        ),
+        DnakeGatewaySensorEntityDescription(
+            key=f"{name}_requests",
+            name=f"{name} requests",
+            state_class=SensorStateClass.TOTAL_INCREASING,
+            value_fn=lambda assistant: assistant.metrics.get_action(name).requests,
+        ),
+        DnakeGatewaySensorEntityDescription(
+            key=f"{name}_errors",
+            name=f"{name} errors",
+            state_class=SensorStateClass.TOTAL_INCREASING,
+            value_fn=lambda assistant: assistant.metrics.get_action(name).errors,
+        ),
+    ]
+
+
+SENSOR_DESCRIPTIONS = [
+    *_action_sensors(Action.ReadAllDevState),
+    *_action_sensors(Action.ReadDev),
+    *_action_sensors(Action.CtrlDev),
+    DnakeGatewaySensorEntityDescription(
+        key="refresh_duration",
+        name="Refresh duration",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda assistant: _to_ms(assistant.metrics.refresh_duration.last),
+        attributes_fn=lambda assistant: _latency_attributes(assistant.metrics.refresh_duration),
+    ),
+    DnakeGatewaySensorEntityDescription(
+        key="updated_entities",
+        name="Entities updated per refresh",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda assistant: assistant.metrics.last_updated_entities,
+        attributes_fn=lambda assistant: {"total": assistant.metrics.total_updated_entities},
+    ),
+    DnakeGatewaySensorEntityDescription(
+        key="queue_wait",
+        name="Request queue wait",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda assistant: _to_ms(assistant.scheduler.get_stats()["avg_wait"]),
+        attributes_fn=lambda assistant: assistant.scheduler.get_stats(),
+    ),
+]
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up gateway diagnostic sensors from a config entry."""
+    assistant = hass.data[DOMAIN][entry.entry_id]["assistant"]
+    async_add_entities(
+        DnakeGatewaySensor(assistant, description) for description in SENSOR_DESCRIPTIONS
+    )
+
+
+class DnakeGatewaySensor(SensorEntity):
+    """Diagnostic sensor exposing gateway performance metrics."""
+
+    entity_description: DnakeGatewaySensorEntityDescription
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    def __init__(self, assistant: Assistant, description: DnakeGatewaySensorEntityDescription):
+        """Initialize the sensor."""
+        self._assistant = assistant
+        self.entity_description = description
+        self._attr_unique_id = f"{assistant.uid}_gateway_{description.key}"
+        self._attr_name = f"Dnake Gateway {description.name}"
+
+    @property
+    def device_info(self) -> DeviceInfo:
+        """Attach the sensor to the gateway device."""
+        return DeviceInfo(identifiers={self._assistant.gateway_identifier})
+
+    @property
+    def native_value(self) -> Any:
+        """Return the current metric value."""
+        return self.entity_description.value_fn(self._assistant)
+
+    @property
+    def extra_state_attributes(self) -> Optional[dict[str, Any]]:
+        """Return the metric details."""
+        if self.entity_description.attributes_fn is None:
+            return None
+        return self.entity_description.attributes_fn(self._assistant)
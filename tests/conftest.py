@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+_ROOT = os.path.join(os.path.dirname(__file__), "..")
+# 与 tools 相同，以 core 包的形式导入，不依赖 Home Assistant
+sys.path.insert(0, os.path.join(_ROOT, "custom_components", "dnake_home"))
+sys.path.insert(0, os.path.join(_ROOT, "tools"))
+
+
+@pytest.fixture
+def simulator():
+    from gateway_simulator import GatewaySimulator
+
+    simulator = GatewaySimulator(device_count=20, port=0, seed=1).start()
+    yield simulator
+    simulator.stop()
@@ -0,0 +1,46 @@
+import asyncio
+
+from core.breaker import STATE_CLOSED, STATE_HALF_OPEN, STATE_OPEN, CircuitBreaker
+from test_gateway import RESET_TIMEOUT, run_with_assistant
+
+
+def test_aborted_probe_reopens_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.allow_request()
+    assert breaker.state == STATE_HALF_OPEN
+
+    breaker.record_aborted()
+    assert breaker.state == STATE_OPEN
+    # 冷却结束后再次放行探测请求
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == STATE_CLOSED
+
+
+def test_cancelled_probe_request_does_not_leave_breaker_half_open(simulator):
+    dev_no, dev_ch = next(iter(simulator.devices))
+
+    async def _test(assistant):
+        simulator.error_rate = 1.0
+        for _ in range(assistant.breaker.failure_threshold):
+            await assistant.turn_to(dev_no, dev_ch, True)
+        assert not assistant.available
+
+        simulator.error_rate = 0.0
+        simulator.latency = 0.5
+        await asyncio.sleep(RESET_TIMEOUT)
+        # 半开状态放行的请求被取消（如脚本被重启）
+        task = asyncio.create_task(assistant.turn_to(dev_no, dev_ch, True))
+        await asyncio.sleep(0.1)
+        assert assistant.breaker.state == STATE_HALF_OPEN
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        assert assistant.breaker.state == STATE_OPEN
+
+        simulator.latency = 0.0
+        await asyncio.sleep(RESET_TIMEOUT)
+        assert await assistant.probe()
+        assert assistant.available
+
+    run_with_assistant(simulator, _test)
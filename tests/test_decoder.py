@@ -0,0 +1,37 @@
+import json
+
+import pytest
+
+from core import decoder
+
+BODY = {
+    "uuid": "A1",
+    "result": "ok",
+    "devList": [
+        {"devType": 256, "devNo": 1, "devCh": 1, "state": 1, "name": "客厅} ]灯"},
+        {"devType": 16665, "devNo": 2, "devCh": 1, "extra": {"timer": [1, {"on": "]}"}], "note": "\"}"}},
+    ],
+}
+
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def backend(request, monkeypatch):
+    if request.param == "stdlib":
+        # 未安装 orjson 时的退回路径
+        monkeypatch.setattr(decoder, "orjson", None)
+    elif decoder.orjson is None:
+        pytest.skip("orjson not installed")
+    return request.param
+
+
+def test_loads_strings_and_nested_objects(backend):
+    body = json.dumps(BODY, ensure_ascii=False).encode("utf-8")
+    assert decoder.loads(body) == BODY
+
+
+def test_truncated_body_raises_value_error(backend):
+    # 请求重试路径只捕获 ValueError
+    body = json.dumps(BODY, ensure_ascii=False).encode("utf-8")
+    for end in range(1, len(body) - 1, 7):
+        with pytest.raises(ValueError):
+            decoder.loads(body[:end])
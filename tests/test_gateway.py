@@ -0,0 +1,103 @@
+import asyncio
+
+import aiohttp
+
+from core.assistant import Assistant
+
+# 测试中缩短熔断冷却时间
+RESET_TIMEOUT = 0.2
+
+
+def run_with_assistant(simulator, test):
+    async def _run():
+        async with aiohttp.ClientSession() as session:
+            assistant = Assistant("test")
+            assistant.breaker.reset_timeout = RESET_TIMEOUT
+            assistant.bind_session(session)
+            assistant.bind_auth_info(simulator.address, "admin", "123456")
+            iot_info = await assistant.query_iot_info()
+            assistant.bind_iot_info(iot_info["iot_device_name"], iot_info["gw_iot_name"])
+            await test(assistant)
+
+    asyncio.run(_run())
+
+
+def test_bulk_refresh(simulator):
+    async def _test(assistant):
+        dev_list = await assistant.read_all_dev_state()
+        assert len(dev_list) == len(simulator.devices)
+        assert {(state["devNo"], state["devCh"]) for state in dev_list} == set(simulator.devices)
+
+    run_with_assistant(simulator, _test)
+
+
+def test_control_and_read_back(simulator):
+    dev_no, dev_ch = next(key for key, device in simulator.devices.items() if device.dev_type == 256)
+
+    async def _test(assistant):
+        assert await assistant.turn_to(dev_no, dev_ch, True)
+        assert simulator.devices[(dev_no, dev_ch)].state["state"] == 1
+        state = await assistant.read_dev_state(dev_no, dev_ch)
+        assert state["state"] == 1
+
+    run_with_assistant(simulator, _test)
+
+
+def test_read_after_control_does_not_join_earlier_read(simulator):
+    dev_no, dev_ch = next(key for key, device in simulator.devices.items() if device.dev_type == 256)
+    simulator.devices[(dev_no, dev_ch)].state["state"] = 0
+
+    async def _test(assistant):
+        # 每个请求在网关处理前固定等待 0.2 秒：第一次读取在控制生效前读到旧状态
+        simulator.latency = 0.2
+        earlier_read = asyncio.create_task(assistant.read_dev_state(dev_no, dev_ch))
+        await asyncio.sleep(0.05)
+        control = asyncio.create_task(assistant.turn_to(dev_no, dev_ch, True))
+        await asyncio.sleep(0.05)
+        # 控制发出后的读取不能共享控制之前发出的读取
+        state = await assistant.read_dev_state(dev_no, dev_ch)
+        assert state["state"] == 1
+        assert (await earlier_read)["state"] == 0
+        assert await control
+
+    run_with_assistant(simulator, _test)
+
+
+async def _open_breaker(assistant):
+    for _ in range(assistant.breaker.failure_threshold):
+        assert await assistant.read_all_dev_state() is None
+        if not assistant.available:
+            return
+    raise AssertionError("circuit breaker did not open")
+
+
+async def _recover(simulator, assistant):
+    # 冷却期内不发请求
+    request_count = simulator.request_count
+    assert not await assistant.probe()
+    assert simulator.request_count == request_count
+    await asyncio.sleep(RESET_TIMEOUT)
+    assert await assistant.probe()
+    assert assistant.available
+
+
+def test_breaker_opens_on_errors_and_recovers(simulator):
+    async def _test(assistant):
+        simulator.error_rate = 1.0
+        await _open_breaker(assistant)
+        simulator.error_rate = 0.0
+        await _recover(simulator, assistant)
+        assert await assistant.read_all_dev_state()
+
+    run_with_assistant(simulator, _test)
+
+
+def test_breaker_opens_on_dropped_connections_and_recovers(simulator):
+    async def _test(assistant):
+        simulator.drop_rate = 1.0
+        await _open_breaker(assistant)
+        simulator.drop_rate = 0.0
+        await _recover(simulator, assistant)
+        assert await assistant.read_all_dev_state()
+
+    run_with_assistant(simulator, _test)
@@ -0,0 +1,12 @@
+from core.metrics import LatencyHistogram
+
+
+def test_ewma_follows_recent_slowdown():
+    histogram = LatencyHistogram()
+    for _ in range(10000):
+        histogram.observe(0.05)
+    for _ in range(30):
+        histogram.observe(0.5)
+    # 启动以来的平均值几乎不变，近期延迟已接近变慢后的水平
+    assert histogram.mean < 0.06
+    assert histogram.ewma > 0.4
@@ -0,0 +1,131 @@
+from core.constant import STATE_FIELDS, DevType
+from core.journal import StateJournal
+from core.registry import DeviceTypeRegistry
+from core.store import DeviceStateStore
+
+LIGHT = DevType.Light.value
+AIR_FRESH = DevType.AirFresh.value
+PANEL_AIR_FRESH = DevType.PanelAirFresh.value
+
+
+def make_store():
+    registry = DeviceTypeRegistry()
+    for dev_type, fields in STATE_FIELDS.items():
+        registry.register(dev_type, "test", fields)(object)
+    return DeviceStateStore(registry, StateJournal())
+
+
+def make_states():
+    # 每轮都是新解析出的记录；面板新风没有 pm25，新风带 pm25
+    return [
+        {"devType": LIGHT, "devNo": 1, "devCh": 1, "state": 0, "online": 1},
+        {"devType": PANEL_AIR_FRESH, "devNo": 2, "devCh": 1, "powerOn": 1, "speed": 2, "errorCode": 0},
+        {"devType": AIR_FRESH, "devNo": 3, "devCh": 1, "powerOn": 0, "speed": 1, "errorCode": 0, "pm25": 35},
+        {"devType": 32768, "devNo": 9, "devCh": 1, "state": 1},
+    ]
+
+
+def subscribe_all(store, keys):
+    received = []
+    for key in keys:
+        store.subscribe(key, received.append)
+    return received
+
+
+def test_new_channels_then_unchanged_refreshes():
+    store = make_store()
+    changed = store.update(make_states())
+    # 未注册的设备类型被丢弃，首次出现的设备为 None
+    assert changed == {(LIGHT, 1, 1): None, (PANEL_AIR_FRESH, 2, 1): None, (AIR_FRESH, 3, 1): None}
+    assert store.get((PANEL_AIR_FRESH, 2, 1)) == {
+        "devType": PANEL_AIR_FRESH, "devNo": 2, "devCh": 1, "powerOn": 1, "speed": 2, "errorCode": 0,
+    }
+    received = subscribe_all(store, changed)
+    for _ in range(3):
+        assert store.update(make_states()) == {}
+    assert received == []
+    assert store.journal.total == 0
+
+
+def test_field_changes_are_journaled_and_dispatched():
+    store = make_store()
+    store.update(make_states())
+    received = subscribe_all(store, [(LIGHT, 1, 1), (PANEL_AIR_FRESH, 2, 1), (AIR_FRESH, 3, 1)])
+    store.update(make_states())
+
+    states = make_states()
+    states[0]["state"] = 1
+    states[1]["pm25"] = 20
+    states[2]["pm25"] = 40
+    # 不相关的字段变化不分发
+    states[0]["online"] = 0
+    changed = store.update(states)
+    assert changed == {
+        (LIGHT, 1, 1): {"state": (0, 1)},
+        (PANEL_AIR_FRESH, 2, 1): {"pm25": (None, 20)},
+        (AIR_FRESH, 3, 1): {"pm25": (35, 40)},
+    }
+    # 分发的是本轮收到的原始记录
+    assert received == states[:3]
+    assert [entry[1:] for entry in store.journal.entries] == list(changed.items())
+
+    states = make_states()
+    states[1]["pm25"] = 20
+    del states[2]["pm25"]
+    assert store.update(states) == {
+        (LIGHT, 1, 1): {"state": (1, 0)},
+        (AIR_FRESH, 3, 1): {"pm25": (40, None)},
+    }
+
+
+def test_string_values_round_trip():
+    store = make_store()
+    states = make_states()
+    states[2]["errorCode"] = "E1"
+    store.update(states)
+    assert store.get((AIR_FRESH, 3, 1))["errorCode"] == "E1"
+
+    states = make_states()
+    states[2]["errorCode"] = "E1"
+    assert store.update(states) == {}
+    states = make_states()
+    states[2]["errorCode"] = "E2"
+    assert store.update(states) == {(AIR_FRESH, 3, 1): {"errorCode": ("E1", "E2")}}
+    assert store.update(make_states()) == {(AIR_FRESH, 3, 1): {"errorCode": ("E2", 0)}}
+    assert store.get((AIR_FRESH, 3, 1))["errorCode"] == 0
+
+
+def test_reordered_and_removed_channels():
+    store = make_store()
+    store.update(make_states())
+    store.update(make_states())
+
+    states = make_states()[::-1]
+    states[0]["state"] = 0
+    states[1]["speed"] = 3
+    assert store.update(states) == {(AIR_FRESH, 3, 1): {"speed": (1, 3)}}
+
+    # 本轮缺少的设备保留上次的状态
+    states = make_states()[1:]
+    states.append({"devType": LIGHT, "devNo": 1, "devCh": 2, "state": 1})
+    assert store.update(states) == {(AIR_FRESH, 3, 1): {"speed": (3, 1)}, (LIGHT, 1, 2): None}
+    assert store.get((LIGHT, 1, 1))["state"] == 0
+    assert store.update(states) == {}
+
+
+def test_invalidate_and_update_channel():
+    store = make_store()
+    store.update(make_states())
+    received = subscribe_all(store, [(LIGHT, 1, 1)])
+
+    store.invalidate(1, 1)
+    states = make_states()
+    assert store.update(states) == {(LIGHT, 1, 1): {}}
+    assert received == [states[0]]
+
+    assert not store.update_channel(1, 1, {"state": 0, "online": 0})
+    assert store.update_channel(1, 1, {"state": 1})
+    assert received[-1] == {"devType": LIGHT, "devNo": 1, "devCh": 1, "state": 1}
+    assert store.get_channel(1, 1)["state"] == 1
+    assert not store.update_channel(5, 5, {"state": 1})
+    assert store.update(make_states()) == {(LIGHT, 1, 1): {"state": (1, 0)}}
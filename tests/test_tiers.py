@@ -0,0 +1,75 @@
+import time
+
+from core.tiers import PollTiers
+
+
+class HotPoll:
+    """模拟 coordinator 的热通道轮询：回调启动，没有可轮询的通道时停止"""
+
+    def __init__(self, tiers):
+        self.tiers = tiers
+        self.running = False
+        self.starts = 0
+        tiers.add_listener(self.start)
+
+    def start(self):
+        if not self.running:
+            self.running = True
+            self.starts += 1
+
+    def poll(self):
+        if not self.tiers.hot_channels():
+            self.running = False
+
+
+def test_hot_poll_restarts_after_pinned_channel_stops_it():
+    tiers = PollTiers()
+    hot_poll = HotPoll(tiers)
+
+    tiers.mark_hot(1, 1)
+    assert hot_poll.running
+    # 窗帘开始移动：通道被固定，热通道轮询无事可做而停止
+    tiers.pin(1, 1)
+    hot_poll.poll()
+    assert not hot_poll.running
+
+    # 其他通道被控制后重新启动
+    tiers.mark_hot(2, 2)
+    assert hot_poll.running
+    assert hot_poll.starts == 2
+
+    tiers.pin(2, 2)
+    hot_poll.poll()
+    assert not hot_poll.running
+    # 窗帘停下后解除固定，同样重新启动
+    tiers.unpin(1, 1)
+    assert hot_poll.running
+    assert tiers.hot_channels() == [(1, 1)]
+
+
+def test_mark_hot_on_pinned_channel_does_not_start_poll():
+    tiers = PollTiers()
+    hot_poll = HotPoll(tiers)
+
+    tiers.pin(1, 1)
+    tiers.mark_hot(1, 1)
+    assert not hot_poll.running
+    assert tiers.hot_channels() == []
+
+
+def test_changes_in_command_window_do_not_extend_hot_time():
+    tiers = PollTiers(hot_ttl=10, command_ttl=0.1)
+
+    tiers.mark_commanded(1, 1)
+    # 控制本身造成的变化被全量刷新或热轮询检测到
+    tiers.mark_changed(1, 1)
+    assert tiers.hot_channels() == [(1, 1)]
+    time.sleep(0.15)
+    assert tiers.hot_channels() == []
+
+    # 控制窗口结束后的变化按 hot_ttl 计
+    tiers.mark_commanded(2, 2)
+    time.sleep(0.15)
+    tiers.mark_changed(2, 2)
+    assert tiers.hot_channels() == [(2, 2)]
+    assert tiers.get_stats()["commanded_channels"] == 0
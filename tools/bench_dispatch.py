@@ -0,0 +1,72 @@
+"""比较旧的逐实体线性查找与按设备索引分发的每次刷新耗时
+
+用法: python tools/bench_dispatch.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "custom_components", "dnake_home"))
+
+from core.registry import DeviceTypeRegistry  # noqa: E402
+from core.store import DeviceStateStore, get_state_key  # noqa: E402
+
+_DEV_TYPES = (256, 514, 16665, 16926)
+
+
+def make_states(count, flip=0):
+    return [
+        {"devNo": 100 + i // 4, "devCh": i % 4, "devType": _DEV_TYPES[i % len(_DEV_TYPES)], "state": (i + flip) % 2}
+        for i in range(count)
+    ]
+
+
+class _Entity:
+    def __init__(self, state):
+        self.dev_type = state["devType"]
+        self.dev_no = state["devNo"]
+        self.dev_ch = state["devCh"]
+        self.hits = 0
+
+    def is_hint_state(self, state):
+        return (
+            state.get("devType") == self.dev_type
+            and state.get("devNo") == self.dev_no
+            and state.get("devCh") == self.dev_ch
+        )
+
+    def update_state(self, state):
+        self.hits += 1
+
+
+def linear_dispatch(entities, states):
+    for entity in entities:
+        state = next((state for state in states if entity.is_hint_state(state)), None)
+        if state:
+            entity.update_state(state)
+
+
+def main():
+    registry = DeviceTypeRegistry()
+    for dev_type in _DEV_TYPES:
+        registry.register(dev_type, "bench", ("state",))(_Entity)
+    print(f"{'channels':>8} {'linear(ms)':>12} {'store(ms)':>12} {'store/ch(us)':>13} {'unchanged(ms)':>14}")
+    for count in (25, 50, 100, 200, 400, 800):
+        states = make_states(count)
+        # 两组状态交替写入，保证每条记录都发生变化并被分发
+        state_sets = [states, make_states(count, flip=1)]
+        entities = [_Entity(state) for state in states]
+        store = DeviceStateStore(registry)
+        for entity in entities:
+            store.subscribe(get_state_key(entity.dev_type, entity.dev_no, entity.dev_ch), entity.update_state)
+        number = max(2, 2000 // count) // 2 * 2
+        counter = iter(range(10 ** 9))
+        linear = min(timeit.repeat(lambda: linear_dispatch(entities, states), number=number, repeat=3)) / number
+        keyed = min(timeit.repeat(lambda: store.update(state_sets[next(counter) % 2]), number=number, repeat=3)) / number
+        unchanged = min(timeit.repeat(lambda: store.update(states), number=number, repeat=3)) / number
+        print(f"{count:>8} {linear * 1e3:>12.3f} {keyed * 1e3:>12.3f} {keyed / count * 1e6:>13.3f} "
+              f"{unchanged * 1e3:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
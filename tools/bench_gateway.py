@@ -0,0 +1,76 @@
+"""对模拟网关测量全量刷新与控制指令的延迟（需要安装 aiohttp）
+
+用法: python tools/bench_gateway.py --devices 200 --latency 50 --rounds 50
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "custom_components", "dnake_home"))
+
+import aiohttp  # noqa: E402
+
+from core.assistant import Assistant  # noqa: E402
+from gateway_simulator import GatewaySimulator  # noqa: E402
+
+
+def _report(name, samples):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(f"{name:<20} n={len(samples):<5} p50={statistics.median(samples) * 1e3:8.2f}ms p95={p95 * 1e3:8.2f}ms")
+
+
+async def _run(simulator, rounds):
+    async with aiohttp.ClientSession() as session:
+        assistant = Assistant("bench")
+        assistant.bind_session(session)
+        assistant.bind_auth_info(simulator.address, "admin", "123456")
+        iot_info = await assistant.query_iot_info()
+        assistant.bind_iot_info(iot_info["iot_device_name"], iot_info["gw_iot_name"])
+        devices = await assistant.query_device_list()
+        lights = [device for device in devices if device.get("ty") == 256]
+
+        refresh, command, failures = [], [], 0
+        for index in range(rounds):
+            start = time.perf_counter()
+            states = await assistant.read_all_dev_state()
+            refresh.append(time.perf_counter() - start)
+            failures += states is None
+            light = lights[index % len(lights)]
+            start = time.perf_counter()
+            ok = await assistant.turn_to(light["nm"], light["ch"], index % 2 == 0)
+            command.append(time.perf_counter() - start)
+            failures += not ok
+        _report("readAllDevState", refresh)
+        _report("ctrlDev", command)
+        print(f"failures: {failures}, gateway requests: {simulator.request_count}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--devices", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0, help="mean latency in ms")
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--drop-rate", type=float, default=0)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+    simulator = GatewaySimulator(
+        device_count=args.devices,
+        port=0,
+        latency=args.latency / 1000,
+        error_rate=args.error_rate,
+        drop_rate=args.drop_rate,
+        seed=1,
+    ).start()
+    try:
+        asyncio.run(_run(simulator, args.rounds))
+    finally:
+        simulator.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""比较 readAllDevState 响应的几种解码方式
+
+- stdlib: json.loads 解析整个响应体（原先 resp.json() 的做法）
+- orjson: 解析整个响应体（未安装 orjson 时跳过）
+
+用法: python tools/bench_json.py
+"""
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "custom_components", "dnake_home"))
+
+from core import decoder  # noqa: E402
+from gateway_simulator import GatewaySimulator  # noqa: E402
+
+
+def make_body(count):
+    simulator = GatewaySimulator(device_count=count)
+    result = simulator.handle_request({"action": "readAllDevState", "uuid": "bench"})
+    return json.dumps(result, ensure_ascii=False).encode("utf-8")
+
+
+def main():
+    decoders = [("stdlib", json.loads)]
+    if decoder.orjson is not None:
+        decoders.append(("orjson", decoder.orjson.loads))
+
+    header = f"{'records':>8} {'body(KB)':>9}" + "".join(f" {name + '(ms)':>12}" for name, _ in decoders)
+    print(header)
+    for count in (100, 500, 1000, 2000, 5000):
+        body = make_body(count)
+        number = max(3, 20000 // count)
+        line = f"{count:>8} {len(body) / 1024:>9.1f}"
+        for _, decode in decoders:
+            elapsed = min(timeit.repeat(lambda: decode(body), number=number, repeat=3)) / number
+            line += f" {elapsed * 1e3:>12.3f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""比较旧的整份 dict 拷贝快照与列式快照在每次全量刷新时的耗时与内存
+
+旧方案：每轮用 f-string 重新拼 key，并对每条记录 state.copy() 作为下一轮比较的基准。
+新方案：DeviceStateStore 按 devType 保存 array 列，key 只在设备首次出现时生成一次，不保留原始记录。
+字段布局取自 STATE_FIELDS（与各平台注册到 DEVICE_TYPES 的相同），包括缺少 pm25 的面板新风。
+
+耗时分两种情况：changed 为每轮 10% 的设备有变化，unchanged 为整轮没有变化（实际轮询中最常见）。
+内存按网关每轮返回的新记录计算：记录在采样期间分配，快照引用的原始记录一并计入常驻内存。
+
+用法: python tools/bench_snapshot.py
+"""
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "custom_components", "dnake_home"))
+
+from core.constant import STATE_FIELDS  # noqa: E402
+from core.registry import DeviceTypeRegistry  # noqa: E402
+from core.store import DeviceStateStore  # noqa: E402
+from gateway_simulator import GatewaySimulator  # noqa: E402
+
+
+class DictSnapshot:
+    """旧的 previous_states 实现"""
+
+    def __init__(self):
+        self.previous_states = {}
+
+    def update(self, states):
+        changed = []
+        for state in states:
+            key = f"{state.get('devNo')}_{state.get('devCh')}"
+            old_state = self.previous_states.get(key)
+            if old_state != state:
+                changed.append(key)
+            self.previous_states[key] = state.copy()
+        return changed
+
+
+def make_state_sets(count):
+    simulator = GatewaySimulator(device_count=count)
+    first = [device.record() for device in simulator.devices.values()]
+    # 第二组里每 10 个设备改变一个字段，模拟常见的少量变化
+    second = [dict(state) for state in first]
+    for index, state in enumerate(second[::10]):
+        fields = [field for field in STATE_FIELDS[state["devType"]] if field in state]
+        field = fields[index % len(fields)]
+        state[field] = state.get(field, 0) + 1
+    return first, second
+
+
+def _receive(states):
+    # 与解析 readAllDevState 响应一样，每轮都是新分配的记录
+    return [dict(state) for state in states]
+
+
+def measure_time(snapshot, state_sets, number):
+    counter = iter(range(10 ** 9))
+    return min(timeit.repeat(
+        lambda: snapshot.update(state_sets[next(counter) % 2]), number=number, repeat=3)) / number
+
+
+def measure_memory(factory, state_sets):
+    tracemalloc.start()
+    snapshot = factory()
+    snapshot.update(_receive(state_sets[0]))
+    states = _receive(state_sets[1])
+    baseline = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    snapshot.update(states)
+    peak = tracemalloc.get_traced_memory()[1]
+    # 丢弃本轮响应后仍被快照持有的内存（包括快照引用的原始记录）
+    del states
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return retained, peak - baseline
+
+
+def main():
+    registry = DeviceTypeRegistry()
+    for dev_type, fields in STATE_FIELDS.items():
+        registry.register(dev_type, "bench", fields)(object)
+
+    print(f"{'channels':>8} {'changed dict/columnar(ms)':>26} {'unchanged dict/columnar(ms)':>28} "
+          f"{'retained dict/columnar(KB)':>27} {'per cycle dict/columnar(KB)':>28}")
+    for count in (50, 200, 800, 3200):
+        state_sets = make_state_sets(count)
+        number = max(2, 4000 // count) // 2 * 2
+        unchanged = (state_sets[0], _receive(state_sets[0]))
+        columns = []
+        for factory in (DictSnapshot, lambda: DeviceStateStore(registry)):
+            columns.append((
+                measure_time(factory(), state_sets, number) * 1e3,
+                measure_time(factory(), unchanged, number) * 1e3,
+                *(value / 1024 for value in measure_memory(factory, state_sets)),
+            ))
+        cells = [f"{old:.3f} / {new:.3f}" if index < 2 else f"{old:.1f} / {new:.1f}"
+                 for index, (old, new) in enumerate(zip(*columns))]
+        print(f"{count:>8} {cells[0]:>26} {cells[1]:>28} {cells[2]:>27} {cells[3]:>28}")
+
+
+if __name__ == "__main__":
+    main()
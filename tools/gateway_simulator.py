@@ -0,0 +1,278 @@
+"""本地狄耐克网关模拟器，用于在没有真实网关时调试和回归测试 Assistant
+
+实现了 /smart/iot.info、/smart/speDev.info 和 /route.cgi?api=request（readDev、readAllDevState、ctrlDev），
+可配置设备数量，并支持注入延迟、错误和断开连接。只依赖标准库。
+
+用法:
+    python tools/gateway_simulator.py --devices 200 --latency 80 --jitter 40 --error-rate 0.02 --drop-rate 0.01
+
+在 Home Assistant 中把网关 IP 配置为 127.0.0.1:8080（或 --port 指定的端口）即可。
+"""
+import argparse
+import base64
+import json
+import random
+import socket
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+# 设备类型与初始状态，字段取自 debug.md / airCondition.md / airFresh.md / airHeater.md 中的真实报文
+_DEVICE_TEMPLATES = (
+    (256, "灯光", {"state": 0}),
+    (514, "窗帘", {"level": 0}),
+    (16665, "空调", {"powerOn": 0, "mode": 2, "speed": 1, "tempDesire": 24, "tempIndoor": 28, "swing": 0}),
+    (16926, "新风", {"speed": 0, "powerOn": 0, "errorCode": 0, "mode": 0, "pm25": 0}),
+    (769, "面板空调", {"code": 0, "powerOn": 0, "mode": 2, "speed": 1, "tempDesire": 24, "swing": 0,
+                   "tempIndoor": 24, "panelLocked": 0, "panelStatus": 0}),
+    (1793, "面板新风", {"code": 0, "powerOn": 0, "speed": 1, "errorCode": 0}),
+    (2048, "地暖", {"powerOn": 0, "tempIndoor": 22, "tempDesire": 20, "panelLocked": 0, "errorCode": 0,
+                  "valve": 0, "highTempProtect": 40, "lowTempProtectEnable": 0}),
+)
+
+# 窗帘从全关到全开（0 -> 254）所需时间（秒）
+COVER_TRAVEL_TIME = 10.0
+
+
+class SimulatedDevice:
+
+    def __init__(self, dev_no, dev_ch, dev_type, name, state):
+        self.dev_no = dev_no
+        self.dev_ch = dev_ch
+        self.dev_type = dev_type
+        self.name = name
+        self.state = dict(state)
+        # 窗帘运动：(起始位置, 目标位置, 起始时间)
+        self._motion = None
+
+    def info(self):
+        return {"na": self.name, "nm": self.dev_no, "ch": self.dev_ch, "ty": self.dev_type, **self.state}
+
+    def read(self):
+        self._advance()
+        return dict(self.state)
+
+    def record(self):
+        return {"devNo": self.dev_no, "devCh": self.dev_ch, "devType": self.dev_type, **self.read()}
+
+    def _advance(self):
+        if self._motion is None:
+            return
+        start, target, started_at = self._motion
+        distance = abs(target - start)
+        progress = (time.monotonic() - started_at) / COVER_TRAVEL_TIME * 254
+        if progress >= distance:
+            self.state["level"] = target
+            self._motion = None
+        else:
+            step = int(progress)
+            self.state["level"] = start + step if target > start else start - step
+
+    def control(self, data):
+        cmd = data.get("cmd")
+        oper = data.get("oper")
+        param = data.get("param")
+        self._advance()
+        if cmd in ("on", "off"):
+            self.state["state"] = 1 if cmd == "on" else 0
+        elif cmd == "level":
+            self._motion = (self.state.get("level", 0), int(data.get("level", 0)), time.monotonic())
+        elif cmd == "stop":
+            self._motion = None
+        elif oper in ("powerOn", "powerOff"):
+            self.state["powerOn"] = 1 if oper == "powerOn" else 0
+        elif oper == "setTemp":
+            self.state["tempDesire"] = param
+        elif oper == "setMode":
+            self.state["mode"] = param
+        elif oper == "setFlow":
+            self.state["speed"] = param
+        elif oper == "setSwing":
+            self.state["swing"] = param
+        elif oper == "setHighTempProtect":
+            self.state["highTempProtect"] = param
+        elif oper == "enableLowTempProtect":
+            self.state["lowTempProtectEnable"] = param
+        else:
+            return False
+        return True
+
+
+class GatewaySimulator:
+    """模拟网关，可在后台线程中运行，故障注入参数可随时修改"""
+
+    def __init__(self, device_count=50, host="127.0.0.1", port=8080, latency=0.0, jitter=0.0,
+                 error_rate=0.0, drop_rate=0.0, username="admin", password="123456", seed=None):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.auth = base64.b64encode(f"{username}:{password}".encode("utf-8")).decode("utf-8")
+        self.random = random.Random(seed)
+        self.devices = {}
+        self.request_count = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+        for index in range(device_count):
+            dev_type, name, state = _DEVICE_TEMPLATES[index % len(_DEVICE_TEMPLATES)]
+            device = SimulatedDevice(100 + index // 4, index % 4 + 1, dev_type, f"{name}{index}", state)
+            self.devices[(device.dev_no, device.dev_ch)] = device
+
+    @property
+    def address(self):
+        return f"{self.host}:{self.port}"
+
+    def start(self):
+        self._server = ThreadingHTTPServer((self.host, self.port), _make_handler(self))
+        self._server.daemon_threads = True
+        # 端口为 0 时使用系统分配的端口
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def serve_forever(self):
+        self._server = ThreadingHTTPServer((self.host, self.port), _make_handler(self))
+        self._server.serve_forever()
+
+    def inject(self):
+        """按配置返回本次请求要注入的故障：None、"error" 或 "drop"，并模拟延迟"""
+        with self._lock:
+            self.request_count += 1
+            delay = max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+            roll = self.random.random()
+        if delay:
+            time.sleep(delay)
+        if roll < self.drop_rate:
+            return "drop"
+        if roll < self.drop_rate + self.error_rate:
+            return "error"
+        return None
+
+    def handle_request(self, data):
+        action = data.get("action")
+        result = {"uuid": data.get("uuid", uuid.uuid4().hex.upper())}
+        with self._lock:
+            if action == "readAllDevState":
+                result["devList"] = [device.record() for device in self.devices.values()]
+                result["result"] = "ok"
+                return result
+            device = self.devices.get((data.get("devNo"), data.get("devCh")))
+            if device is None:
+                result["result"] = "fail"
+            elif action == "readDev":
+                result.update(device.read())
+                result["result"] = "ok"
+            elif action == "ctrlDev":
+                result["result"] = "ok" if device.control(data) else "fail"
+            else:
+                result["result"] = "fail"
+        return result
+
+
+def _make_handler(simulator: GatewaySimulator):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # 响应头与响应体合并发送，避免 Nagle 与延迟确认叠加出的额外 40ms
+        wbufsize = 64 * 1024
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def _check_fault(self):
+            fault = simulator.inject()
+            if fault == "drop":
+                # 不返回任何响应直接断开连接
+                self.close_connection = True
+                try:
+                    self.connection.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+                return True
+            if fault == "error":
+                self._send_json({"result": "fail"}, status=500)
+                return True
+            if self.headers.get("Authorization") != f"Basic {simulator.auth}":
+                self._send_json({"result": "unauthorized"}, status=401)
+                return True
+            return False
+
+        def _send_json(self, payload, status=200):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self._check_fault():
+                return
+            path = urlparse(self.path).path
+            if path == "/smart/iot.info":
+                self._send_json({"iotDeviceName": "ha-simulator", "gwIotName": "dnake-simulator"})
+            elif path == "/smart/speDev.info":
+                self._send_json({"dl": [device.info() for device in simulator.devices.values()]})
+            else:
+                self._send_json({"result": "not found"}, status=404)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = self.rfile.read(length)
+            if self._check_fault():
+                return
+            if urlparse(self.path).path != "/route.cgi":
+                self._send_json({"result": "not found"}, status=404)
+                return
+            try:
+                data = json.loads(body).get("data", {})
+            except ValueError:
+                self._send_json({"result": "fail"}, status=400)
+                return
+            self._send_json(simulator.handle_request(data))
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dnake gateway simulator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--devices", type=int, default=50, help="number of device channels")
+    parser.add_argument("--latency", type=float, default=0, help="mean response latency in ms")
+    parser.add_argument("--jitter", type=float, default=0, help="latency jitter in ms")
+    parser.add_argument("--error-rate", type=float, default=0, help="ratio of HTTP 500 responses")
+    parser.add_argument("--drop-rate", type=float, default=0, help="ratio of dropped connections")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    simulator = GatewaySimulator(
+        device_count=args.devices,
+        host=args.host,
+        port=args.port,
+        latency=args.latency / 1000,
+        jitter=args.jitter / 1000,
+        error_rate=args.error_rate,
+        drop_rate=args.drop_rate,
+        seed=args.seed,
+    )
+    print(f"Dnake gateway simulator listening on {simulator.address} with {len(simulator.devices)} devices")
+    try:
+        simulator.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()